@@ -1,31 +1,29 @@
-import geopandas as gpd
 from pathlib import Path
 from shapely.geometry import Point
 import pandas as pd
 
+from geom_metrics import geometry_metrics, point_distance
+from taz_cache import cached_intersection, read_projected
+from taz_io import SJTPO_COUNTIES, read_block_groups, write_layer
+
 # Define input and output paths
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 bg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_by_bg.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_by_bg.parquet")
 csv_path = Path(r"J:\TAZ_Adustment\Output\taz_area_centroid_comparison.csv")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 print("🔄 Loading TAZ shapefile...")
-taz_gdf = gpd.read_file(taz_path)
+taz_gdf = read_projected(taz_path)
 
 print("🔄 Loading 2020 Census Block Groups...")
-bg_gdf = gpd.read_file(bg_path)
-
-# Filter only for SJTPO counties: Atlantic (001), Cape May (009), Cumberland (011), Salem (033)
-print("📍 Filtering for Atlantic, Cape May, Cumberland, and Salem counties...")
-target_counties = ["001", "009", "011", "033"]
-bg_gdf = bg_gdf[bg_gdf["COUNTYFP"].isin(target_counties)]
-
-print("🧭 Reprojecting to EPSG:3424 for accurate area and distance calculations...")
-taz_gdf = taz_gdf.to_crs(epsg=3424)
-bg_gdf = bg_gdf.to_crs(epsg=3424)
+# Only SJTPO counties are read: Atlantic (001), Cape May (009), Cumberland (011), Salem (033)
+bg_gdf = read_projected(bg_path, loader=read_block_groups, counties=SJTPO_COUNTIES, columns=None)
 
 print("🔗 Performing spatial intersection...")
-intersection = gpd.overlay(bg_gdf, taz_gdf[['TRACT2010', 'geometry']], how='intersection', keep_geom_type=False)
+intersection = cached_intersection(
+    taz_gdf, bg_gdf, "TRACT2010", sources=[taz_path, bg_path], keep_geom_type=False, cbg_first=True
+)
 intersection['area'] = intersection.geometry.area
 
 print("🧮 Assigning each BG to the dominant TAZ by area...")
@@ -35,28 +33,32 @@ dominant_taz = intersection.drop_duplicates(subset='GEOID')[['GEOID', 'TRACT2010
 # Merge dominant TAZ back to the full filtered BG file
 bg_gdf = bg_gdf.merge(dominant_taz, on='GEOID', how='left')
 
-print(f"💾 Saving adjusted BG shapefile to {output_path}...")
-bg_gdf.to_file(output_path)
+print(f"💾 Saving adjusted BG layer to {output_path}...")
+write_layer(bg_gdf, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 # ======= BEGIN COMPARISON ANALYSIS =======
 print("📏 Calculating original TAZ areas and centroids...")
-taz_gdf['orig_area_sqft'] = taz_gdf.geometry.area
-taz_gdf['orig_centroid'] = taz_gdf.geometry.centroid
+taz_metrics = geometry_metrics(taz_gdf)
+taz_gdf['orig_area_sqft'] = taz_metrics['area_ft2']
+taz_gdf['orig_cen_x'] = taz_metrics['centroid_x']
+taz_gdf['orig_cen_y'] = taz_metrics['centroid_y']
 
 print("🧩 Reconstructing new TAZ geometries from assigned Block Groups...")
 new_taz = bg_gdf.dropna(subset=['TRACT2010']).dissolve(by='TRACT2010')
-new_taz['new_area_sqft'] = new_taz.geometry.area
-new_taz['new_centroid'] = new_taz.geometry.centroid
+new_metrics = geometry_metrics(new_taz)
+new_taz['new_area_sqft'] = new_metrics['area_ft2']
+new_taz['new_cen_x'] = new_metrics['centroid_x']
+new_taz['new_cen_y'] = new_metrics['centroid_y']
 
 print("🔗 Merging original and new TAZ data for comparison...")
-taz_compare = taz_gdf.set_index('TRACT2010')[['orig_area_sqft', 'orig_centroid']].join(
-    new_taz[['new_area_sqft', 'new_centroid']], how='inner'
+taz_compare = taz_gdf.set_index('TRACT2010')[['orig_area_sqft', 'orig_cen_x', 'orig_cen_y']].join(
+    new_taz[['new_area_sqft', 'new_cen_x', 'new_cen_y']], how='inner'
 ).dropna()
 
 print("📐 Calculating centroid shift distances...")
-taz_compare['centroid_shift_ft'] = taz_compare.apply(
-    lambda row: row['orig_centroid'].distance(row['new_centroid']),
-    axis=1
+taz_compare['centroid_shift_ft'] = point_distance(
+    taz_compare['orig_cen_x'], taz_compare['orig_cen_y'],
+    taz_compare['new_cen_x'], taz_compare['new_cen_y']
 )
 
 print("📊 Creating summary table with TAZ ID as first column...")
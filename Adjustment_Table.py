@@ -1,7 +1,9 @@
-import geopandas as gpd
 import pandas as pd
 from pathlib import Path
 
+from taz_cache import cached_intersection, read_projected
+from taz_io import read_block_groups
+
 # Update these paths to match your local file locations
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 bg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
@@ -9,19 +11,16 @@ output_csv = Path(r"J:\TAZ_Adustment\Output\TAZ_Relocation_Table.csv")
 
 # Load shapefiles
 print("🔄 Loading TAZ shapefile...")
-taz_gdf = gpd.read_file(taz_path)
+taz_gdf = read_projected(taz_path)
 
 print("🔄 Loading Block Groups shapefile...")
-bg_gdf = gpd.read_file(bg_path)
-
-# Reproject to NJ State Plane (EPSG:3424)
-print("🧭 Reprojecting to EPSG:3424 for area calculations...")
-taz_gdf = taz_gdf.to_crs(epsg=3424)
-bg_gdf = bg_gdf.to_crs(epsg=3424)
+bg_gdf = read_projected(bg_path, loader=read_block_groups, within=taz_gdf)
 
 # Perform spatial overlay
 print("🔗 Performing spatial intersection...")
-intersection = gpd.overlay(bg_gdf, taz_gdf[['TRACT2010', 'geometry']], how='intersection', keep_geom_type=False)
+intersection = cached_intersection(
+    taz_gdf, bg_gdf, "TRACT2010", sources=[taz_path, bg_path], keep_geom_type=False, cbg_first=True
+)
 
 # Calculate area in square feet
 intersection['area_sf'] = intersection.geometry.area
@@ -4,14 +4,27 @@ from shapely.geometry import LineString
 from pathlib import Path
 import pandas as pd
 
+from taz_cache import read_projected
+from taz_io import write_layer
+from taz_reassign import merge_small_parcels
+
 # File paths
 input_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\Fourth.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\Fourth_merged.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\Fourth_merged.parquet")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
+
+# Merge settings
+# "sequential" = the original per-parcel loop; "deferred" = assign all parcels, then merge each target once.
+# The loop merges parcels in order, so a later parcel is measured against polygons that already absorbed
+# earlier ones and can chain onto them. Deferred mode picks every target from the unmerged polygons
+# (CASCADE_ROUNDS adds retry rounds against the merged ones), so its merged shapes and unmerged counts
+# can differ from the loop wherever small parcels touch each other. Check them before switching.
+MERGE_MODE = "sequential"
+CASCADE_ROUNDS = 0  # deferred mode only: extra rounds letting leftover parcels attach to merged neighbours
 
 # Load and reproject data
 print("🔄 Loading shapefile...")
-gdf = gpd.read_file(input_path)
-gdf = gdf.to_crs("EPSG:3424")  # Ensure units in feet
+gdf = read_projected(input_path)  # NJ State Plane, units in feet
 
 # Compute area in acres
 gdf["area_acres"] = gdf.geometry.area / 43560
@@ -23,50 +36,57 @@ large_gdf = gdf[gdf["area_acres"] > 5].copy()
 # Create spatial index for large polygons
 large_sindex = large_gdf.sindex
 
-# Store unmerged small parcels
-unmerged = []
-
-print("🔁 Merging small parcels...")
-for idx, small_row in small_gdf.iterrows():
-    small_geom = small_row.geometry
-    geoid = small_row["GEOID2020"]
-
-    # Find candidate neighbors with same GEOID2020
-    candidates_idx = list(large_sindex.intersection(small_geom.bounds))
-    candidates = large_gdf.iloc[candidates_idx]
-    candidates = candidates[candidates["GEOID2020"] == geoid]
-
-    # Find neighbor with longest shared boundary
-    max_shared_len = 0
-    best_idx = None
-
-    for cidx, candidate in candidates.iterrows():
-        shared = small_geom.boundary.intersection(candidate.geometry.boundary)
-        if isinstance(shared, LineString):
-            shared_len = shared.length
-        elif shared.geom_type.startswith("Multi"):
-            shared_len = sum(part.length for part in shared.geoms if isinstance(part, LineString))
-        else:
-            shared_len = 0
+print(f"🔁 Merging small parcels ({MERGE_MODE})...")
+if MERGE_MODE == "deferred":
+    large_gdf, unmerged_gdf = merge_small_parcels(
+        small_gdf, large_gdf, key="GEOID2020", sindex=large_sindex, cascade_rounds=CASCADE_ROUNDS
+    )
+    print(f"   {len(small_gdf) - len(unmerged_gdf)} merged, {len(unmerged_gdf)} left unmerged")
+else:
+    # Store unmerged small parcels
+    unmerged = []
+
+    for idx, small_row in small_gdf.iterrows():
+        small_geom = small_row.geometry
+        geoid = small_row["GEOID2020"]
+
+        # Find candidate neighbors with same GEOID2020
+        candidates_idx = list(large_sindex.intersection(small_geom.bounds))
+        candidates = large_gdf.iloc[candidates_idx]
+        candidates = candidates[candidates["GEOID2020"] == geoid]
 
-        if shared_len > max_shared_len:
-            max_shared_len = shared_len
-            best_idx = cidx
+        # Find neighbor with longest shared boundary
+        max_shared_len = 0
+        best_idx = None
+
+        for cidx, candidate in candidates.iterrows():
+            shared = small_geom.boundary.intersection(candidate.geometry.boundary)
+            if isinstance(shared, LineString):
+                shared_len = shared.length
+            elif shared.geom_type.startswith("Multi"):
+                shared_len = sum(part.length for part in shared.geoms if isinstance(part, LineString))
+            else:
+                shared_len = 0
+
+            if shared_len > max_shared_len:
+                max_shared_len = shared_len
+                best_idx = cidx
+
+        if best_idx is not None:
+            # Merge small into best match
+            best_geom = large_gdf.at[best_idx, "geometry"]
+            merged_geom = unary_union([small_geom, best_geom])
+            large_gdf.at[best_idx, "geometry"] = merged_geom
+        else:
+            unmerged.append(small_row)
 
-    if best_idx is not None:
-        # Merge small into best match
-        best_geom = large_gdf.at[best_idx, "geometry"]
-        merged_geom = unary_union([small_geom, best_geom])
-        large_gdf.at[best_idx, "geometry"] = merged_geom
-    else:
-        unmerged.append(small_row)
+    unmerged_gdf = gpd.GeoDataFrame(unmerged, crs=gdf.crs)
 
 # Combine results
-unmerged_gdf = gpd.GeoDataFrame(unmerged, crs=gdf.crs)
 final_gdf = pd.concat([large_gdf, unmerged_gdf], ignore_index=True)
 
 # Save output
 print(f"💾 Saving output to {output_path}...")
-final_gdf.to_file(output_path)
+write_layer(final_gdf, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 print("✅ Done merging small parcels.")
@@ -1,25 +1,22 @@
-import geopandas as gpd
 from pathlib import Path
 
+from taz_cache import cached_intersection, read_projected
+from taz_io import read_block_groups, write_layer
+
 # --- File paths ---
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 cbg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV5.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV5.parquet")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 # --- Load shapefiles ---
 print("🔄 Loading 2010 TAZs and 2020 CBGs...")
-taz = gpd.read_file(taz_path)
-cbg = gpd.read_file(cbg_path)
-
-# --- Reproject if needed (to NJ State Plane US Feet) ---
-if taz.crs.is_geographic:
-    taz = taz.to_crs(epsg=6539)
-if cbg.crs.is_geographic:
-    cbg = cbg.to_crs(epsg=6539)
+taz = read_projected(taz_path)
+cbg = read_projected(cbg_path, loader=read_block_groups, within=taz)
 
 # --- Step 1: Intersect TAZs with 2020 Block Groups ---
 print("📐 Intersecting TAZs (TAZ_112011) with 2020 CBGs...")
-intersect = gpd.overlay(taz[['TAZ_112011', 'geometry']], cbg[['GEOID', 'geometry']], how='intersection')
+intersect = cached_intersection(taz, cbg, "TAZ_112011", sources=[taz_path, cbg_path])
 
 # --- Step 2: Extract 2020 GEOID block group code and GEOID5 ---
 intersect["GEOID2020"] = intersect["GEOID"].str[-7:]      # Last 7 digits (block group code)
@@ -36,8 +33,8 @@ dissolved["GEOID5"] = dissolved["GEOID5"]
 dissolved["GEOID2020"] = dissolved["GEOID2020"]
 final = dissolved.drop(columns=["TAZ_GEOID5"])
 
-# --- Save to shapefile ---
+# --- Save output ---
 print(f"💾 Saving output to {output_path}")
-final.to_file(output_path)
+write_layer(final, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 print("🎉 Done: TAZs split by 2020 CBGs and merged by TAZ_112011 + GEOID5.")
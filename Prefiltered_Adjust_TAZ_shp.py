@@ -1,28 +1,25 @@
-import geopandas as gpd
 from pathlib import Path
 
+from taz_cache import cached_intersection, read_projected
+from taz_io import SJTPO_COUNTIES, read_block_groups, write_layer
+
 # Define input and output paths
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 bg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_by_bg.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_by_bg.parquet")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 print("🔄 Loading TAZ shapefile...")
-taz_gdf = gpd.read_file(taz_path)
+taz_gdf = read_projected(taz_path)
 
 print("🔄 Loading 2020 Census Block Groups...")
-bg_gdf = gpd.read_file(bg_path)
-
-# Filter only for SJTPO counties: Atlantic (001), Cape May (009), Cumberland (011), Salem (033)
-print("📍 Filtering for Atlantic, Cape May, Cumberland, and Salem counties...")
-target_counties = ["001", "009", "011", "033"]
-bg_gdf = bg_gdf[bg_gdf["COUNTYFP"].isin(target_counties)]
-
-print("🧭 Reprojecting to EPSG:3424 for accurate area calculations...")
-taz_gdf = taz_gdf.to_crs(epsg=3424)
-bg_gdf = bg_gdf.to_crs(epsg=3424)
+# Only SJTPO counties are read: Atlantic (001), Cape May (009), Cumberland (011), Salem (033)
+bg_gdf = read_projected(bg_path, loader=read_block_groups, counties=SJTPO_COUNTIES, columns=None)
 
 print("🔗 Performing spatial intersection...")
-intersection = gpd.overlay(bg_gdf, taz_gdf[['TRACT2010', 'geometry']], how='intersection', keep_geom_type=False)
+intersection = cached_intersection(
+    taz_gdf, bg_gdf, "TRACT2010", sources=[taz_path, bg_path], keep_geom_type=False, cbg_first=True
+)
 intersection['area'] = intersection.geometry.area
 
 print("🧮 Assigning each BG to the dominant TAZ by area...")
@@ -33,6 +30,6 @@ dominant_taz = intersection.drop_duplicates(subset='GEOID')[['GEOID', 'TRACT2010
 bg_gdf = bg_gdf.merge(dominant_taz, on='GEOID', how='left')
 
 print(f"💾 Saving output to {output_path}...")
-bg_gdf.to_file(output_path)
+write_layer(bg_gdf, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
-print("✅ Shapefile export complete.")
+print("✅ Export complete.")
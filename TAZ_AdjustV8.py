@@ -1,38 +1,32 @@
-import geopandas as gpd
 import numpy as np
 from pathlib import Path
 
+from geom_metrics import geometry_metrics, point_distance
+from taz_cache import cached_intersection, read_projected
+from taz_io import read_block_groups, write_layer
+from taz_reassign import closest_geoids
+
 # === File Paths ===
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 cbg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV8_with_centroids.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV8_with_centroids.parquet")
 audit_log_path = Path(r"J:\TAZ_Adustment\Output\reassigned_small_parcels.csv")
 invalid_geom_path = Path(r"J:\TAZ_Adustment\Output\TAZv8_invalid_geometry.gpkg")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 # === Load Files ===
 print("🔄 Loading TAZ and CBG files...")
-taz = gpd.read_file(taz_path)
-cbg = gpd.read_file(cbg_path)
-
-# === Project to NJ State Plane (ft) ===
-if taz.crs.is_geographic:
-    taz = taz.to_crs(epsg=6539)
-if cbg.crs.is_geographic:
-    cbg = cbg.to_crs(epsg=6539)
+taz = read_projected(taz_path)
+cbg = read_projected(cbg_path, loader=read_block_groups, within=taz)
 
 # === Step 1: Intersect 2010 TAZs with 2020 Block Groups ===
 print("📐 Performing spatial intersection...")
-intersect = gpd.overlay(
-    taz[['TAZ_112011', 'geometry']],
-    cbg[['GEOID', 'geometry']],
-    how='intersection',
-    keep_geom_type=False
-)
+intersect = cached_intersection(taz, cbg, "TAZ_112011", sources=[taz_path, cbg_path], keep_geom_type=False)
 
 # === Step 2: Process GEOIDs and Calculate Area ===
 intersect["GEOID2020"] = intersect["GEOID"].str[-7:]
 intersect["GEOID5"] = intersect["GEOID2020"].str[:5]
-intersect["area_acres"] = intersect.geometry.area / 43560
+intersect["area_acres"] = geometry_metrics(intersect)["area_acres"]
 intersect["GEOID2020_int"] = intersect["GEOID2020"].astype(int)
 
 # === Step 3: Reassign Small Parcels by Closest GEOID within ±999 ===
@@ -40,18 +34,10 @@ SMALL_PARCEL_ACRES = 0.5
 valid_geoids = intersect["GEOID2020_int"].unique()
 valid_array = np.array(valid_geoids)
 
-def find_closest_geoid(val, candidates, threshold=999):
-    diffs = abs(candidates - val)
-    min_diff = diffs.min()
-    if min_diff < threshold:
-        return candidates[diffs.argmin()]
-    else:
-        return val
-
 print("🔍 Reassigning small parcels by closest GEOID...")
 small = intersect["area_acres"] < SMALL_PARCEL_ACRES
-intersect.loc[small, "GEOID2020_int"] = intersect.loc[small, "GEOID2020_int"].apply(
-    lambda x: find_closest_geoid(x, valid_array, threshold=999)
+intersect.loc[small, "GEOID2020_int"] = closest_geoids(
+    intersect.loc[small, "GEOID2020_int"], valid_array, threshold=999
 )
 
 # Post-check
@@ -79,25 +65,28 @@ dissolved["GEOID2020"] = dissolved["final_GEOID2020"]
 
 # === Step 6: Add area and centroid shift info ===
 print("➕ Adding acreage and centroid distance info...")
-taz["TAZ_area_acres"] = taz.geometry.area / 43560
-taz["TAZ_centroid"] = taz.geometry.centroid
+taz_metrics = geometry_metrics(taz)
+taz["TAZ_area_acres"] = taz_metrics["area_acres"]
+taz["TAZ_cen_x"] = taz_metrics["centroid_x"]
+taz["TAZ_cen_y"] = taz_metrics["centroid_y"]
 
 # Merge original area and centroid
 dissolved = dissolved.merge(
-    taz[['TAZ_112011', 'TAZ_area_acres', 'TAZ_centroid']],
+    taz[['TAZ_112011', 'TAZ_area_acres', 'TAZ_cen_x', 'TAZ_cen_y']],
     on='TAZ_112011',
     how='left'
 )
 
-dissolved["poly_area_acres"] = dissolved.geometry.area / 43560
-dissolved["new_centroid"] = dissolved.geometry.centroid
-dissolved["centroid_dist_ft"] = dissolved.apply(
-    lambda row: row["new_centroid"].distance(row["TAZ_centroid"]), axis=1
+dissolved_metrics = geometry_metrics(dissolved)
+dissolved["poly_area_acres"] = dissolved_metrics["area_acres"]
+dissolved["centroid_dist_ft"] = point_distance(
+    dissolved_metrics["centroid_x"], dissolved_metrics["centroid_y"],
+    dissolved["TAZ_cen_x"], dissolved["TAZ_cen_y"]
 )
 
 # Final cleanup
 dissolved = dissolved.drop(columns=[
-    "TAZ_centroid", "new_centroid", "TAZ_GEOID5", "final_GEOID2020"
+    "TAZ_cen_x", "TAZ_cen_y", "TAZ_GEOID5", "final_GEOID2020"
 ])
 
 # === Step 7A: Filter invalid geometry types for Shapefile
@@ -111,8 +100,8 @@ if not invalid.empty:
 
 dissolved = dissolved[dissolved.geometry.type.isin(valid_types)]
 
-# === Step 8: Save as Shapefile
-print(f"💾 Saving output as Shapefile to {output_path}")
-dissolved.to_file(output_path)
+# === Step 8: Save output
+print(f"💾 Saving output to {output_path}")
+write_layer(dissolved, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
-print("✅ Done! Shapefile created with centroid shift, area acres, and reassigned GEOIDs.")
+print("✅ Done! Output created with centroid shift, area acres, and reassigned GEOIDs.")
@@ -1,88 +1,77 @@
-import geopandas as gpd
 import pandas as pd
 from pathlib import Path
 
+from geom_metrics import centroid_points, geometry_metrics
+from qa_rules import QA_CONFIG_PATH, evaluate, load_thresholds
+from taz_cache import read_projected
+from taz_io import write_layer
+from taz_telemetry import RunTelemetry
+
 # === File paths ===
 taz_2020_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV11.shp")
 taz_2011_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM FINAL TAZ_NOV2011.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsQA.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsQA.parquet")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
-# === Load shapefiles ===
-print("🔄 Loading TAZ shapefiles...")
-taz20 = gpd.read_file(taz_2020_path)
-taz11 = gpd.read_file(taz_2011_path)
+telemetry = RunTelemetry("TAZ_QA_V4")
 
-# === Project both to NJ State Plane (EPSG:6539, US Feet) ===
-taz20 = taz20.to_crs(epsg=6539)
-taz11 = taz11.to_crs(epsg=6539)
+# === Load shapefiles ===
+with telemetry.step("Load") as step:
+    print("🔄 Loading TAZ shapefiles...")
+    taz20 = read_projected(taz_2020_path)
+    taz11 = read_projected(taz_2011_path)
+    step.outputs(taz20, taz11)
 
 # === Ensure ID is string for reliable join ===
-taz20['TAZ_112011'] = taz20['TAZ_112011'].astype(str)
-taz11['TAZ_112011'] = taz11['TAZ_112011'].astype(str)
+with telemetry.step("Normalize TAZ IDs", taz20, taz11):
+    taz20['TAZ_112011'] = taz20['TAZ_112011'].astype(str)
+    taz11['TAZ_112011'] = taz11['TAZ_112011'].astype(str)
 
 # === Compute areas in ACRES and centroids ===
-print("📐 Calculating area (acres) and centroids...")
-taz20['Area20'] = (taz20.geometry.area / 43560).round(2)
-taz20['Cent20'] = taz20.geometry.centroid
+with telemetry.step("Areas and centroids", taz20, taz11):
+    print("📐 Calculating area (acres) and centroids...")
+    taz20['Area20'] = geometry_metrics(taz20)['area_acres'].round(2)
+    taz20['Cent20'] = centroid_points(taz20)
 
-taz11['Area11'] = (taz11.geometry.area / 43560).round(2)
-taz11['Cent11'] = taz11.geometry.centroid
+    taz11['Area11'] = geometry_metrics(taz11)['area_acres'].round(2)
+    taz11['Cent11'] = centroid_points(taz11)
 
 # === Prepare 2011 attributes with _11 suffix ===
-taz11_attrs = taz11.drop(columns='geometry').copy()
-taz11_attrs = taz11_attrs.rename(columns={
-    col: f"{col}_11" for col in taz11_attrs.columns
-    if col not in ['TAZ_112011', 'Area11', 'Cent11']
-})
+with telemetry.step("Prepare 2011 attributes", taz11) as step:
+    taz11_attrs = taz11.drop(columns='geometry').copy()
+    taz11_attrs = taz11_attrs.rename(columns={
+        col: f"{col}_11" for col in taz11_attrs.columns
+        if col not in ['TAZ_112011', 'Area11', 'Cent11']
+    })
+    step.outputs(taz11_attrs)
 
 # === Merge TAZs on TAZ_112011 ===
-print("🔗 Merging datasets...")
-merged = taz20.merge(taz11_attrs, on='TAZ_112011', how='outer', indicator=True)
-
-# === QA Flag Function ===
-def flag_record(row):
-    flags = []
-    diffpct = None
-    centdist = None
-
-    if row['_merge'] == 'left_only':
-        flags.append("Missing_in_2011")
-    elif row['_merge'] == 'right_only':
-        flags.append("Missing_in_2020")
-    else:
-        area_20 = row.get('Area20')
-        area_11 = row.get('Area11')
-        cent_20 = row.get('Cent20')
-        cent_11 = row.get('Cent11')
-
-        if pd.notnull(area_20) and pd.notnull(area_11) and area_11 > 0:
-            diffpct = round(abs((area_20 - area_11) / area_11 * 100), 2)
-            if diffpct > 5:
-                flags.append("AreaMismatch")
-
-        if pd.notnull(cent_20) and pd.notnull(cent_11):
-            try:
-                centdist = round(cent_11.distance(cent_20), 1)
-                if centdist > 500:
-                    flags.append("CentroidMismatch")
-            except:
-                centdist = None
-
-    flag = "|".join(flags) if flags else "OK"
-    return pd.Series([flag, diffpct, centdist])
+with telemetry.step("Merge", taz20, taz11_attrs) as step:
+    print("🔗 Merging datasets...")
+    merged = taz20.merge(taz11_attrs, on='TAZ_112011', how='outer', indicator=True)
+    step.outputs(merged)
 
 # === Apply flag logic and assign new fields ===
-print("🚩 Applying QA checks...")
-merged[['Flag', 'DiffPct', 'CentDist']] = merged.apply(flag_record, axis=1)
+with telemetry.step("Apply QA checks", merged) as step:
+    print("🚩 Applying QA checks...")
+    # Round before comparing with the thresholds, as the original row-wise check did
+    qa = evaluate(merged, load_thresholds(QA_CONFIG_PATH), diff_decimals=2, dist_decimals=1)
+    merged['Flag'] = qa['Flag']
+    merged['DiffPct'] = qa['DiffPct']
+    merged['CentDist'] = qa['CentDist']
+    step.outputs(merged)
 
 # === Clean up before saving ===
-print("🧼 Cleaning up output fields...")
-columns_to_drop = ['Cent20', 'Cent11', '_merge', 'Shape_Area', 'Shape_Leng']
-merged.drop(columns=columns_to_drop, inplace=True, errors='ignore')
+with telemetry.step("Clean up fields", merged):
+    print("🧼 Cleaning up output fields...")
+    columns_to_drop = ['Cent20', 'Cent11', '_merge', 'Shape_Area', 'Shape_Leng']
+    merged.drop(columns=columns_to_drop, inplace=True, errors='ignore')
 
-# === Save output shapefile ===
-print("💾 Writing cleaned QA shapefile...")
-merged = merged.set_geometry('geometry')
-merged.to_file(output_path)
+# === Save QA output ===
+with telemetry.step("Save QA output", merged):
+    print("💾 Writing cleaned QA output...")
+    merged = merged.set_geometry('geometry')
+    write_layer(merged, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 print(f"✅ QA complete. Output saved to:\n{output_path}")
+telemetry.finish()
@@ -2,21 +2,21 @@ import geopandas as gpd
 import numpy as np
 from pathlib import Path
 
+from geom_metrics import geometry_metrics, point_distance
+from taz_cache import read_projected
+from taz_io import read_block_groups, write_layer
+from taz_reassign import closest_geoids
+
 # === File Paths ===
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 cbg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV5_with_centroids.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\2020TAZsV5_with_centroids.parquet")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 # === Load Files ===
 print("🔄 Loading TAZ and CBG files...")
-taz = gpd.read_file(taz_path)
-cbg = gpd.read_file(cbg_path)
-
-# === Project to NJ State Plane (ft) ===
-if taz.crs.is_geographic:
-    taz = taz.to_crs(epsg=6539)
-if cbg.crs.is_geographic:
-    cbg = cbg.to_crs(epsg=6539)
+taz = read_projected(taz_path)
+cbg = read_projected(cbg_path, loader=read_block_groups, within=taz)
 
 # === Step 1: Intersect 2010 TAZs with 2020 Block Groups ===
 print("📐 Performing spatial intersection...")
@@ -29,7 +29,7 @@ intersect = gpd.overlay(
 # === Step 2: Process GEOIDs ===
 intersect["GEOID2020"] = intersect["GEOID"].str[-7:]
 intersect["GEOID5"] = intersect["GEOID2020"].str[:5]
-intersect["area_acres"] = intersect.geometry.area / 43560
+intersect["area_acres"] = geometry_metrics(intersect)["area_acres"]
 
 # Convert to integer for matching
 intersect["GEOID2020_int"] = intersect["GEOID2020"].astype(int)
@@ -39,18 +39,10 @@ SMALL_PARCEL_ACRES = 0.5
 valid_geoids = intersect["GEOID2020_int"].unique()
 valid_array = np.array(valid_geoids)
 
-def find_closest_geoid(val, candidates, threshold=99):
-    diffs = abs(candidates - val)
-    min_diff = diffs.min()
-    if min_diff < threshold:
-        return candidates[diffs.argmin()]
-    else:
-        return val  # Keep original if no close match
-
 print("🔍 Reassigning small parcels by closest GEOID...")
 small = intersect["area_acres"] < SMALL_PARCEL_ACRES
-intersect.loc[small, "GEOID2020_int"] = intersect.loc[small, "GEOID2020_int"].apply(
-    lambda x: find_closest_geoid(x, valid_array)
+intersect.loc[small, "GEOID2020_int"] = closest_geoids(
+    intersect.loc[small, "GEOID2020_int"], valid_array, threshold=99
 )
 
 # Back to string for output consistency
@@ -69,30 +61,33 @@ dissolved = dissolved.drop(columns=["TAZ_GEOID5"])
 
 # === Step 6: Add original TAZ area, new polygon area, and centroid distance ===
 print("➕ Adding acreage and centroid distance info...")
-taz["TAZ_area_acres"] = taz.geometry.area / 43560
-taz["TAZ_centroid"] = taz.geometry.centroid
+taz_metrics = geometry_metrics(taz)
+taz["TAZ_area_acres"] = taz_metrics["area_acres"]
+taz["TAZ_cen_x"] = taz_metrics["centroid_x"]
+taz["TAZ_cen_y"] = taz_metrics["centroid_y"]
 
 # Merge original area/centroid into new geometry
-dissolved = dissolved.merge(taz[['TAZ_112011', 'TAZ_area_acres', 'TAZ_centroid']], on='TAZ_112011', how='left')
+dissolved = dissolved.merge(taz[['TAZ_112011', 'TAZ_area_acres', 'TAZ_cen_x', 'TAZ_cen_y']], on='TAZ_112011', how='left')
 
 # Add new polygon area in acres
-dissolved["poly_area_acres"] = dissolved.geometry.area / 43560
+dissolved_metrics = geometry_metrics(dissolved)
+dissolved["poly_area_acres"] = dissolved_metrics["area_acres"]
 
 # Calculate centroid distance (ft)
-dissolved["new_centroid"] = dissolved.geometry.centroid
-dissolved["centroid_dist_ft"] = dissolved.apply(
-    lambda row: row["new_centroid"].distance(row["TAZ_centroid"]), axis=1
+dissolved["centroid_dist_ft"] = point_distance(
+    dissolved_metrics["centroid_x"], dissolved_metrics["centroid_y"],
+    dissolved["TAZ_cen_x"], dissolved["TAZ_cen_y"]
 )
 
 # Cleanup
-dissolved = dissolved.drop(columns=["TAZ_centroid", "new_centroid"])
+dissolved = dissolved.drop(columns=["TAZ_cen_x", "TAZ_cen_y"])
 
 # === Final: Add area_acres field for visibility ===
-dissolved["area_acres"] = dissolved.geometry.area / 43560
+dissolved["area_acres"] = dissolved_metrics["area_acres"]
 
 # === Step 7: Save output ===
 print(f"💾 Saving output to {output_path}")
-dissolved.to_file(output_path)
+write_layer(dissolved, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 print("✅ Done! Output includes reassigned GEOIDs, original/new area, centroid shift, and area in acres.")
 
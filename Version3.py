@@ -1,64 +1,50 @@
 import geopandas as gpd
 from pathlib import Path
 
+from geom_metrics import geometry_metrics, point_distance
+from taz_cache import read_projected
+from taz_io import read_block_groups, write_layer
+from taz_overlay import preserve_or_split
+
 # File paths
 taz_path = Path(r"J:\TAZ_Adustment\Input\2010GIS\SJTDM Final TAZ_Nov2011.shp")
 bg_path = Path(r"J:\TAZ_Adustment\Input\2020GIS\tl_2022_34_bg.shp")
-output_shp = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_preserved_enhanced.shp")
+output_path = Path(r"J:\TAZ_Adustment\Output\adjusted_taz_preserved_enhanced.parquet")
 summary_csv = Path(r"J:\TAZ_Adustment\Output\taz_adjustment_summary.csv")
+EXPORT_SHAPEFILE = False  # also write a .shp copy of the output for ArcGIS
 
 # Load and reproject
 print("🔄 Loading and projecting data...")
-taz_gdf = gpd.read_file(taz_path).to_crs("EPSG:3424")
-bg_gdf = gpd.read_file(bg_path).to_crs("EPSG:3424")
+taz_gdf = read_projected(taz_path)
+bg_gdf = read_projected(bg_path, loader=read_block_groups, within=taz_gdf)
 
 # Prepare original TAZ metrics
-taz_gdf["source_area"] = taz_gdf.geometry.area
-taz_gdf["source_centroid"] = taz_gdf.geometry.centroid
+taz_metrics = geometry_metrics(taz_gdf)
 
-# Start processing
-adjusted = []
+# Preserve TAZs inside a single block group, split the rest
 print("⚙️ Processing TAZs...")
-for _, taz in taz_gdf.iterrows():
-    taz_id = taz["TAZ_112011"]
-    taz_geom = taz.geometry
-    source_area = taz["source_area"]
-    source_centroid = taz["source_centroid"]
-
-    overlaps = bg_gdf[bg_gdf.intersects(taz_geom)]
-
-    if len(overlaps) == 1:
-        tract = overlaps.iloc[0]["GEOID"]
-        dest_geom = taz_geom
-        dest_centroid = dest_geom.centroid
-        adjusted.append({
-            "TAZID": taz_id,
-            "TRACT2010": tract,
-            "Preserved": 1,
-            "area_sft": dest_geom.area,
-            "source_area": source_area,
-            "centroid_shift": source_centroid.distance(dest_centroid),
-            "geometry": dest_geom
-        })
-    else:
-        taz_one = gpd.GeoDataFrame([taz], crs=taz_gdf.crs)
-        split = gpd.overlay(overlaps, taz_one, how="intersection", keep_geom_type=True)
-        for _, part in split.iterrows():
-            tract = part["GEOID"]
-            dest_geom = part.geometry
-            dest_centroid = dest_geom.centroid
-            adjusted.append({
-                "TAZID": taz_id,
-                "TRACT2010": tract,
-                "Preserved": 0,
-                "area_sft": dest_geom.area,
-                "source_area": source_area,
-                "centroid_shift": source_centroid.distance(dest_centroid),
-                "geometry": dest_geom
-            })
+parts = preserve_or_split(taz_gdf, bg_gdf)
+taz_rows = taz_gdf.iloc[parts["taz_pos"]]
+bg_rows = bg_gdf.iloc[parts["bg_pos"]]
+source_metrics = taz_metrics.iloc[parts["taz_pos"]]
+dest_metrics = geometry_metrics(parts)
 
 # Build GeoDataFrame
-adjusted_gdf = gpd.GeoDataFrame(adjusted, crs=taz_gdf.crs)
+adjusted_gdf = gpd.GeoDataFrame(
+    {
+        "TAZID": taz_rows["TAZ_112011"].to_numpy(),
+        "TRACT2010": bg_rows["GEOID"].to_numpy(),
+        "Preserved": parts["Preserved"].to_numpy(),
+        "area_sft": dest_metrics["area_ft2"].to_numpy(),
+        "source_area": source_metrics["area_ft2"].to_numpy(),
+        "centroid_shift": point_distance(
+            source_metrics["centroid_x"], source_metrics["centroid_y"],
+            dest_metrics["centroid_x"], dest_metrics["centroid_y"]
+        ),
+    },
+    geometry=parts.geometry.values,
+    crs=taz_gdf.crs,
+)
 
 # Convert area to acres and round values
 adjusted_gdf["area_acres"] = (adjusted_gdf["area_sft"] / 43560).round(2)
@@ -69,8 +55,8 @@ adjusted_gdf["centroid_shift"] = adjusted_gdf["centroid_shift"].round(2)
 adjusted_gdf = adjusted_gdf.drop(columns=["area_sft", "source_area"])
 
 # Save outputs
-print(f"💾 Saving shapefile to {output_shp}...")
-adjusted_gdf.to_file(output_shp)
+print(f"💾 Saving output to {output_path}...")
+write_layer(adjusted_gdf, output_path, export_shapefile=EXPORT_SHAPEFILE)
 
 print(f"📄 Saving summary to {summary_csv}...")
 adjusted_gdf.drop(columns="geometry").to_csv(summary_csv, index=False)
@@ -0,0 +1,229 @@
+"""Offline benchmark of the TAZ adjustment steps on synthetic layers.
+
+Usage::
+
+    python benchmark_taz.py                        # 1k, 10k and 100k zones
+    python benchmark_taz.py --sizes 1000 10000 --repeat 3
+    python benchmark_taz.py --save-baseline        # record this machine's baseline
+
+For every size, ``taz_synthetic.synthetic_layers`` builds a TAZ and a block
+group layer. They are written to a temporary folder, then the steps of
+TAZ_AdjustV9.py / "TAZs V10.py" are run through the same shared modules and
+timed one by one:
+
+    load       read both layers (block groups through ``read_block_groups``)
+    reproject  both layers to NJ State Plane
+    overlay    TAZ x block group intersection (``overlay_intersection``)
+    reassign   piece areas and closest-GEOID reassignment of small parcels (V9)
+    slivers    merge slivers into neighbouring pieces (``reassign_slivers``, V10)
+    dissolve   pieces by TAZ and GEOID5
+    metrics    area, centroids and centroid shift of TAZs and dissolved zones
+    write      GeoParquet output
+
+The on-disk caches (``read_projected`` / ``cached_intersection``) are
+bypassed, so every run does the full work. Each stage reports the best of
+``--repeat`` runs. Results go to ``outputs/benchmarks/taz_benchmark.json``.
+
+When a baseline file exists, every stage is compared against it. A stage
+regresses when it takes more than ``baseline * (1 + tolerance)`` plus
+``MIN_SLACK_S`` seconds; the slack keeps millisecond stages from tripping on
+noise. Any regression makes the script exit with status 1. Timings only
+compare on the same machine, so the baseline is a local file (recorded with
+``--save-baseline``) rather than part of the repository.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from geom_metrics import geometry_metrics, point_distance
+from taz_io import NJ_STATE_PLANE, read_block_groups, read_layer, write_parquet
+from taz_overlay import overlay_intersection
+from taz_reassign import closest_geoids, reassign_slivers
+from taz_synthetic import DEFAULT_CBG_RATIO, DEFAULT_MISALIGNMENT, synthetic_layers
+from taz_telemetry import RunTelemetry
+
+ROOT = Path(__file__).resolve().parent
+BENCHMARK_DIR = ROOT / "outputs" / "benchmarks"
+RESULTS_PATH = BENCHMARK_DIR / "taz_benchmark.json"
+BASELINE_PATH = BENCHMARK_DIR / "taz_benchmark_baseline.json"
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 0.25
+MIN_SLACK_S = 0.05
+STAGES = ["load", "reproject", "overlay", "reassign", "slivers", "dissolve", "metrics", "write"]
+
+# Same settings as the production scripts
+SMALL_PARCEL_ACRES = 0.5  # TAZ_AdjustV9.py
+SLIVER_THRESHOLD_ACRES = 2  # "TAZs V10.py"
+
+
+def write_inputs(n_zones, folder, suffix=".parquet", misalignment=DEFAULT_MISALIGNMENT, cbg_ratio=DEFAULT_CBG_RATIO):
+    """Write the synthetic layers for ``n_zones`` to ``folder``; return their paths and counts."""
+    taz, cbg = synthetic_layers(n_zones, misalignment=misalignment, cbg_ratio=cbg_ratio)
+    taz_path, cbg_path = Path(folder) / f"taz{suffix}", Path(folder) / f"cbg{suffix}"
+    for gdf, path in [(taz, taz_path), (cbg, cbg_path)]:
+        if suffix == ".parquet":
+            write_parquet(gdf, path)
+        else:
+            gdf.to_file(path)
+    return taz_path, cbg_path, {"zones": len(taz), "block_groups": len(cbg)}
+
+
+def run_stages(taz_path, cbg_path, out_path):
+    """One timed pass over the adjustment steps; returns ``(seconds, counts)``."""
+    timer = RunTelemetry("benchmark_taz", path=None, count_vertices=False, verbose=False)
+
+    with timer.step("load"):
+        taz = read_layer(taz_path)
+        cbg = read_block_groups(cbg_path, within=taz)
+
+    with timer.step("reproject"):
+        taz = taz.to_crs(NJ_STATE_PLANE)
+        cbg = cbg.to_crs(NJ_STATE_PLANE)
+
+    with timer.step("overlay"):
+        pieces = overlay_intersection(taz, cbg, keep_geom_type=False)
+
+    with timer.step("reassign"):
+        pieces["GEOID5"] = pieces["GEOID"].str[-5:]
+        pieces["area_acres"] = geometry_metrics(pieces)["area_acres"]
+        geoid_int = pieces["GEOID"].str[-7:].astype(int)
+        small = (pieces["area_acres"] < SMALL_PARCEL_ACRES).to_numpy()
+        geoid_int[small] = closest_geoids(geoid_int[small], geoid_int.unique(), threshold=999)
+        pieces["final_GEOID2020"] = geoid_int.astype(str)
+
+    with timer.step("slivers"):
+        merged = reassign_slivers(pieces, SLIVER_THRESHOLD_ACRES)
+
+    with timer.step("dissolve"):
+        merged["TAZ_GEOID5"] = merged["TAZ_112011"].astype(str) + "_" + merged["final_GEOID2020"].str[:5]
+        dissolved = merged.dissolve(by="TAZ_GEOID5", as_index=False)
+
+    with timer.step("metrics"):
+        taz_metrics = geometry_metrics(taz, refresh=True).set_index(taz["TAZ_112011"])
+        dissolved_metrics = geometry_metrics(dissolved, refresh=True)
+        origin = taz_metrics.loc[dissolved["TAZ_112011"]]
+        dissolved["poly_area_acres"] = dissolved_metrics["area_acres"]
+        dissolved["centroid_dist_ft"] = point_distance(
+            dissolved_metrics["centroid_x"], dissolved_metrics["centroid_y"],
+            origin["centroid_x"], origin["centroid_y"],
+        )
+
+    with timer.step("write"):
+        write_parquet(dissolved, out_path)
+
+    counts = {
+        "pieces": len(pieces),
+        "small_parcels": int(small.sum()),
+        "slivers_merged": len(pieces) - len(merged),
+        "output_zones": len(dissolved),
+        "vertices": int(shapely.get_num_coordinates(np.asarray(dissolved.geometry.values)).sum()),
+    }
+    return timer.seconds(), counts
+
+
+def run_benchmark(sizes, repeat=1, suffix=".parquet", misalignment=DEFAULT_MISALIGNMENT, cbg_ratio=DEFAULT_CBG_RATIO):
+    """Best-of-``repeat`` stage seconds and feature counts for every size, keyed by zone count."""
+    results = {}
+    for n_zones in sizes:
+        with tempfile.TemporaryDirectory(prefix="taz_benchmark_") as folder:
+            print(f"🧪 {n_zones:,} zones: generating synthetic layers...")
+            taz_path, cbg_path, counts = write_inputs(n_zones, folder, suffix, misalignment, cbg_ratio)
+            runs = []
+            for _ in range(repeat):
+                seconds, run_counts = run_stages(taz_path, cbg_path, Path(folder) / "out.parquet")
+                runs.append(seconds)
+        best = {stage: round(min(run[stage] for run in runs), 4) for stage in STAGES}
+        results[str(n_zones)] = {**counts, **run_counts, "seconds": best, "total_seconds": round(sum(best.values()), 4)}
+        print(f"  ⏱️ {results[str(n_zones)]['total_seconds']:.2f}s  " + "  ".join(f"{s} {t:.2f}" for s, t in best.items()))
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "geopandas": gpd.__version__,
+        "shapely": shapely.__version__,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE, slack=MIN_SLACK_S):
+    """Stages slower than ``baseline * (1 + tolerance) + slack``, as a DataFrame (empty = none).
+
+    Only sizes and stages present in both runs are compared.
+    """
+    rows = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if base is None:
+            continue
+        for stage, seconds in result["seconds"].items():
+            if stage in base["seconds"]:
+                limit = base["seconds"][stage] * (1 + tolerance) + slack
+                rows.append({"zones": size, "stage": stage, "baseline_s": base["seconds"][stage],
+                             "seconds": seconds, "limit_s": round(limit, 4)})
+    comparison = pd.DataFrame(rows, columns=["zones", "stage", "baseline_s", "seconds", "limit_s"])
+    return comparison[comparison["seconds"] > comparison["limit_s"]]
+
+
+def save_results(results, path, **settings):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": settings,
+        "results": results,
+    }
+    path.write_text(json.dumps(record, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the TAZ adjustment steps on synthetic layers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="zone counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size; the fastest is kept")
+    parser.add_argument("--format", choices=["parquet", "shp"], default="parquet", help="input layer format")
+    parser.add_argument("--misalignment", type=float, default=DEFAULT_MISALIGNMENT,
+                        help="block group seed offset, as a fraction of the zone spacing")
+    parser.add_argument("--cbg-ratio", type=float, default=DEFAULT_CBG_RATIO, help="block groups per TAZ")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="results JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown per stage as a fraction of the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="also save this run as the baseline")
+    args = parser.parse_args()
+
+    print("TAZ Adjustment Benchmark Starting...")
+    settings = {"repeat": args.repeat, "format": args.format, "misalignment": args.misalignment,
+                "cbg_ratio": args.cbg_ratio}
+    results = run_benchmark(args.sizes, args.repeat, f".{args.format}", args.misalignment, args.cbg_ratio)
+    save_results(results, args.output, **settings)
+    print(f"📄 Results saved to {args.output}")
+
+    if args.save_baseline:
+        save_results(results, args.baseline, **settings)
+        print(f"📌 Baseline saved to {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["settings"] != settings:
+            print(f"⚠️ Baseline settings {baseline['settings']} differ from this run's {settings}")
+        regressions = find_regressions(results, baseline["results"], args.tolerance)
+        if not regressions.empty:
+            print(f"❌ {len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}:")
+            print(regressions.to_string(index=False))
+            sys.exit(1)
+        print(f"✅ No stage regressed more than {args.tolerance:.0%} against {args.baseline.name}")
+    else:
+        print(f"ℹ️ No baseline at {args.baseline}; run with --save-baseline to record one.")
@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+
+from taz_cache import read_projected
+from taz_skims import distance_matrix, save_skim, zone_centroids
+from trip_distribution import DISTANCE_CORE, SKIM_PATH
+
+# === Settings ===
+taz_path = Path(os.environ.get("SJTDM_ADJUSTED_TAZ", r"J:\TAZ_Adustment\Output\2020TAZsV9_with_centroids.parquet"))  # set by pipeline.py --taz-layer
+output_path = SKIM_PATH  # outputs/skims/skims.odm, read by tripdist.py
+ZONE_COL = "TAZ_112011"  # split pieces of a TAZ are skimmed as one zone
+METRIC = "euclidean"     # or "manhattan"
+CIRCUITY = 1.0           # network / straight-line distance ratio, e.g. 1.2
+
+# === Step 1: Load adjusted TAZ layer ===
+print("🔄 Loading adjusted TAZ layer...")
+taz = read_projected(taz_path)
+
+# === Step 2: Area-weighted centroid per zone ===
+print(f"📍 Computing centroids by {ZONE_COL}...")
+zones = zone_centroids(taz, ZONE_COL)
+print(f"✅ {len(taz)} features collapsed to {len(zones)} zones.")
+
+# === Step 3: Full distance matrix with intrazonal estimates ===
+print(f"📏 Building {len(zones)} x {len(zones)} {METRIC} distance skim (circuity {CIRCUITY})...")
+distance = distance_matrix(zones["x"], zones["y"], zones["area_ft2"], metric=METRIC, circuity=CIRCUITY)
+print(f"   Intrazonal: mean {distance.diagonal().mean():.2f} mi; interzonal max {distance.max():.1f} mi")
+
+# === Step 4: Save skim ===
+print(f"💾 Saving skim to {output_path}")
+save_skim(output_path, zones["zone"], distance, core=DISTANCE_CORE)
+
+print(f"✅ Done. {distance.nbytes / 1e6:.1f} MB float32 distance skim written.")
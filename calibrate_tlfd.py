@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import os
+
+from tlfd_calibration import OBSERVED_TLFD_PATH, calibrate_curve, load_observed_tlfd
+from trip_distribution import (
+    FRICTION_CURVES,
+    FRICTION_PATH,
+    SKIM_PATH,
+    align_panda,
+    distance_bins,
+    load_distance_skim,
+    load_friction_factors,
+)
+
+print("Friction Factor Calibration Starting...")
+
+# === Settings ===
+TOLERANCE = 0.005       # max absolute gap in any bin's share of trips
+MAX_ITERATIONS = 30
+BALANCE = True          # Furness-balance each iteration, as tripbalance.py does
+
+# === Step 1: Load PANDA, skim, current factors and observed TLFD ===
+if not OBSERVED_TLFD_PATH.exists():
+    raise FileNotFoundError(
+        f"No observed TLFD at {OBSERVED_TLFD_PATH} — expected DIST_BIN_MI plus one column of "
+        "observed trips (or shares) per curve, using the bins of gravity_friction_factors.csv."
+    )
+zones, distance = load_distance_skim(SKIM_PATH)
+friction_table = pd.read_csv(FRICTION_PATH)
+lower_edges, factors = load_friction_factors(FRICTION_PATH)
+observed = load_observed_tlfd(OBSERVED_TLFD_PATH, friction_table["DIST_BIN_MI"])
+panda, _ = align_panda(pd.read_csv("outputs/panda.csv"), zones)
+
+bins = distance_bins(distance, lower_edges)
+print(f"✅ {len(zones)} zones, {len(lower_edges)} distance bins, observed TLFDs for {', '.join(observed.columns)}.")
+
+# === Step 2: Calibrate each curve against its own purpose ===
+calibrated = friction_table.copy()
+history = []
+for curve_name in observed.columns:
+    if curve_name not in factors.columns or FRICTION_CURVES.get(curve_name) != curve_name:
+        print(f"⚠️ No PANDA purpose uses curve {curve_name} directly — skipped.")
+        continue
+
+    curve, steps = calibrate_curve(
+        panda[f"{curve_name}P"].to_numpy(),
+        panda[f"{curve_name}A"].to_numpy(),
+        bins,
+        observed[curve_name].to_numpy(),
+        factors[curve_name].to_numpy(),
+        tol=TOLERANCE,
+        max_iter=MAX_ITERATIONS,
+        balance=BALANCE,
+    )
+    calibrated[curve_name] = np.round(curve, 4)
+    history.append(steps.assign(CURVE=curve_name))
+
+    gap = steps["max_share_gap"].iloc[-1]
+    icon = "✅" if gap <= TOLERANCE else "⚠️"
+    print(f"  {icon} {curve_name}: {len(steps)} iterations, max bin share gap {gap:.4f}")
+
+# === Step 3: Save calibrated factors and iteration log ===
+output_folder = "outputs"
+qa_folder = os.path.join(output_folder, "qa")
+os.makedirs(qa_folder, exist_ok=True)
+
+output_path = os.path.join(output_folder, "gravity_friction_factors_calibrated.csv")
+calibrated.to_csv(output_path, index=False)
+if history:
+    log_path = os.path.join(qa_folder, "tlfd_calibration_log.csv")
+    pd.concat(history, ignore_index=True).to_csv(log_path, index=False)
+    print(f"📋 Iteration log saved to {log_path}")
+
+print(f"✅ Calibrated friction factors saved to {output_path}")
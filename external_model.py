@@ -0,0 +1,100 @@
+"""External station trips: growth, external-internal ends and Fratar-grown through trips.
+
+All functions work on whole arrays at once. Stations are the last axis and
+forecast years the first, so hundreds of stations across several years are
+grown and balanced in one call.
+
+Through (E-E) trips are grown by Fratar / biproportional iteration. A base
+E-E seed matrix is scaled alternately to each year's grown row (origin) and
+column (destination) station totals. Every year is handled in the same
+``years x stations x stations`` array operations.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOLERANCE = 1e-6
+DEFAULT_MAX_ITERATIONS = 100
+
+
+def grow(base, growth):
+    """``years x stations`` volumes: ``base`` (stations) times ``growth`` (years x stations)."""
+    return np.asarray(growth, dtype=np.float64) * np.asarray(base, dtype=np.float64)[None, :]
+
+
+def uniform_seed(n_stations):
+    """E-E seed with one trip between every pair of distinct stations (no U-turns)."""
+    seed = np.ones((n_stations, n_stations))
+    np.fill_diagonal(seed, 0.0)
+    return seed
+
+
+def _ratio(target, current):
+    return np.divide(target, current, out=np.zeros_like(current), where=current > 0)
+
+
+def fratar(seed, row_targets, col_targets=None, tol=DEFAULT_TOLERANCE, max_iter=DEFAULT_MAX_ITERATIONS):
+    """Grow ``seed`` to each year's station totals by biproportional iteration.
+
+    ``row_targets`` / ``col_targets`` are ``years x stations`` (or one row
+    of ``stations``). Column targets default to the row targets, which is the
+    symmetric case where each station's E-E volume is both its origins and
+    its destinations. Column targets are scaled to each year's row total.
+
+    Returns ``(tables, report)``. ``tables`` is ``years x stations x stations``.
+    ``report`` has the ``iterations``, the ``max_error`` across years and
+    whether it ``converged``. When ``max_iter`` runs out, ``max_error`` covers
+    both the rows and the columns of the returned tables.
+    """
+    seed = np.asarray(seed, dtype=np.float64)
+    rows = np.atleast_2d(np.asarray(row_targets, dtype=np.float64))
+    cols = rows if col_targets is None else np.atleast_2d(np.asarray(col_targets, dtype=np.float64))
+    n_years, n_stations = rows.shape
+    if seed.shape != (n_stations, n_stations) or cols.shape != rows.shape:
+        raise ValueError(f"Seed {seed.shape} and targets {rows.shape}/{cols.shape} do not match")
+
+    col_total = cols.sum(axis=1, keepdims=True)
+    cols = cols * _ratio(rows.sum(axis=1, keepdims=True), col_total)
+
+    tables = np.broadcast_to(seed, (n_years, n_stations, n_stations)).copy()
+    max_error, iteration = np.inf, 0
+    for iteration in range(1, max_iter + 1):
+        tables *= _ratio(rows, tables.sum(axis=2))[:, :, None]
+        col_sum = tables.sum(axis=1)
+        reachable = (cols > 0) & (col_sum > 0)
+        gaps = np.abs(col_sum[reachable] - cols[reachable]) / cols[reachable]
+        max_error = float(gaps.max()) if gaps.size else 0.0
+        if max_error <= tol:
+            break
+        tables *= _ratio(cols, col_sum)[:, None, :]
+    else:
+        # Out of iterations after a column pass: measure the tables being returned
+        row_sum, col_sum = tables.sum(axis=2), tables.sum(axis=1)
+        live_rows = (rows > 0) & (row_sum > 0)
+        reachable = (cols > 0) & (col_sum > 0)
+        gaps = np.concatenate([
+            np.abs(row_sum[live_rows] - rows[live_rows]) / rows[live_rows],
+            np.abs(col_sum[reachable] - cols[reachable]) / cols[reachable],
+        ])
+        max_error = float(gaps.max()) if gaps.size else 0.0
+
+    return tables, {"iterations": iteration, "max_error": max_error, "converged": max_error <= tol}
+
+
+def external_trip_ends(stations, growth, years):
+    """Long table of grown trip ends: one row per station and year.
+
+    ``stations`` has ``EXTERNAL_ID`` and base-year volume columns, e.g.
+    ``P_TRIPS`` / ``A_TRIPS`` (external-internal) and ``EE_TRIPS`` (through).
+    ``growth`` is ``years x stations``. Every volume column is grown by the
+    same station factor.
+    """
+    volume_cols = [c for c in stations.columns if c != "EXTERNAL_ID"]
+    growth = np.asarray(growth, dtype=np.float64)
+    n_years, n_stations = growth.shape
+    out = {
+        "EXTERNAL_ID": np.tile(stations["EXTERNAL_ID"].to_numpy(), n_years),
+        "YEAR": np.repeat(np.asarray(years), n_stations),
+    }
+    for col in volume_cols:
+        out[col] = grow(stations[col].to_numpy(), growth).ravel()
+    return pd.DataFrame(out)
@@ -1,51 +1,67 @@
-add-special-generators
+import numpy as np
 import pandas as pd
 import os
 
+from external_model import external_trip_ends, fratar, uniform_seed
+from matrix_store import write_matrix_store
+
 print("External Trip Builder Starting...")
 
-# === Step 1: Define External Trip Data ===
-# (You can replace these values with your real regional external forecasts later!)
+# === Step 1: Define Base-Year External Station Data ===
+# (You can replace these values with your real regional external counts and forecasts later!)
+BASE_YEAR = 2020
+FORECAST_YEARS = [2030, 2040, 2050]
+
 external_data = {
     "EXTERNAL_ID": [9001, 9002, 9003, 9004],
-    "P_TRIPS": [2500, 1800, 3200, 1500],
-    "A_TRIPS": [2600, 1750, 3100, 1600],
+    "P_TRIPS": [2500, 1800, 3200, 1500],     # external-internal, production at the station
+    "A_TRIPS": [2600, 1750, 3100, 1600],     # internal-external, attraction at the station
+    "EE_TRIPS": [600, 400, 900, 300],        # through trips crossing the station
+    "ANNUAL_GROWTH": [0.010, 0.008, 0.012, 0.005],
 }
+stations = pd.DataFrame(external_data)
 
-df = pd.DataFrame(external_data)
+# Optional observed through-trip table (ORIG, DEST, TRIPS); otherwise every station pair is equally likely
+seed_path = "inputs/external_ee_seed.csv"
 
-# === Step 2: Create Outputs Folder if Needed ===
-outputs_folder = "outputs"
-os.makedirs(outputs_folder, exist_ok=True)
+# === Step 2: Growth Factors for Every Station and Year ===
+years = np.array([BASE_YEAR, *FORECAST_YEARS])
+growth = (1 + stations["ANNUAL_GROWTH"].to_numpy())[None, :] ** (years - BASE_YEAR)[:, None]
 
-# === Step 3: Save External Trip File ===
-output_path = os.path.join(outputs_folder, "external_trips.csv")
-df.to_csv(output_path, index=False)
+trip_ends = external_trip_ends(stations.drop(columns="ANNUAL_GROWTH"), growth, years)
+trip_ends[["P_TRIPS", "A_TRIPS", "EE_TRIPS"]] = trip_ends[["P_TRIPS", "A_TRIPS", "EE_TRIPS"]].round(1)
+print(f"✅ Grew {len(stations)} stations to {len(years)} years ({', '.join(map(str, years))}).")
 
-print(f"✅ External trips file created at {output_path}")
-=======
-import pandas as pd
-import os
+# === Step 3: Through-Trip (E-E) Matrices by Fratar ===
+station_ids = stations["EXTERNAL_ID"].to_numpy()
+if os.path.exists(seed_path):
+    observed = pd.read_csv(seed_path)
+    seed = (
+        observed.pivot_table(index="ORIG", columns="DEST", values="TRIPS", aggfunc="sum", fill_value=0)
+        .reindex(index=station_ids, columns=station_ids, fill_value=0)
+        .to_numpy(dtype=float)
+    )
+    print(f"✅ Loaded E-E seed from {seed_path}")
+else:
+    seed = uniform_seed(len(stations))
+    print("⚠️ No external_ee_seed.csv found — using a uniform E-E seed.")
 
-print("External Trip Builder Starting...")
+# Each through trip crosses two stations, so a station's EE volume splits evenly into origins and destinations
+ee_ends = trip_ends["EE_TRIPS"].to_numpy().reshape(len(years), len(stations)) / 2
+ee_tables, report = fratar(seed, ee_ends)
+icon = "✅" if report["converged"] else "⚠️"
+print(f"{icon} Fratar: {report['iterations']} iterations, max error {report['max_error']:.1e}")
 
-# === Step 1: Define External Trip Data ===
-# (You can replace these values with your real regional external forecasts later!)
-external_data = {
-    "EXTERNAL_ID": [9001, 9002, 9003, 9004],
-    "P_TRIPS": [2500, 1800, 3200, 1500],
-    "A_TRIPS": [2600, 1750, 3100, 1600],
-}
-
-df = pd.DataFrame(external_data)
-
-# === Step 2: Create Outputs Folder if Needed ===
+# === Step 4: Create Outputs Folder if Needed ===
 outputs_folder = "outputs"
 os.makedirs(outputs_folder, exist_ok=True)
 
-# === Step 3: Save External Trip File ===
+# === Step 5: Save External Trip Files ===
 output_path = os.path.join(outputs_folder, "external_trips.csv")
-df.to_csv(output_path, index=False)
+trip_ends.to_csv(output_path, index=False)
+
+ee_path = os.path.join(outputs_folder, "external_ee.odm")
+write_matrix_store(ee_path, station_ids, {f"EE_{year}": table for year, table in zip(years, ee_tables)})
 
 print(f"✅ External trips file created at {output_path}")
-main
+print(f"✅ E-E trip tables ({len(years)} years) saved to {ee_path}")
@@ -0,0 +1,109 @@
+"""Continuous friction functions for gravity distribution.
+
+Three standard forms, with distance ``d`` in miles::
+
+    gamma        F = a * d**-b * exp(-c * d)
+    exponential  F = a * exp(-c * d)
+    power        F = a * d**-b
+
+``fit_function`` fits one of them to a binned curve (such as the factors in
+``gravity_friction_factors.csv``) by least squares on ``log F``, which is
+linear in ``log a``, ``b`` and ``c``. Zero factors carry no information on the
+log scale and are left out.
+
+``friction_matrix`` evaluates a function over a whole distance matrix through
+a lookup table on a fine distance grid. The table is cached per function and
+parameter set, so repeated evaluations (every calibration iteration, every
+scenario) cost one integer index per cell, with no ``exp`` or ``pow``.
+Distances below ``MIN_DISTANCE_MI`` are clamped so ``d**-b`` stays finite.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+FRICTION_FUNCTIONS_PATH = ROOT / "outputs" / "friction_functions.json"
+MIN_DISTANCE_MI = 0.1
+LOOKUP_STEP_MI = 0.01
+QA_MAX_DISTANCE_MI = 60
+
+
+def gamma(d, a, b, c):
+    return a * d ** -b * np.exp(-c * d)
+
+
+def exponential(d, a, c):
+    return a * np.exp(-c * d)
+
+
+def power(d, a, b):
+    return a * d ** -b
+
+
+FUNCTIONS = {"gamma": gamma, "exponential": exponential, "power": power}
+
+
+def evaluate(kind, distance, params):
+    """``kind`` evaluated directly (no lookup) over any array of distances."""
+    if kind not in FUNCTIONS:
+        raise ValueError(f"Unknown friction function {kind!r} (choose from {', '.join(FUNCTIONS)})")
+    d = np.maximum(np.asarray(distance, dtype=np.float64), MIN_DISTANCE_MI)
+    return FUNCTIONS[kind](d, **params)
+
+
+def fit_function(kind, distance, factors):
+    """Least-squares ``params`` of ``kind`` through ``(distance, factors)`` points on the log scale."""
+    distance = np.maximum(np.asarray(distance, dtype=np.float64), MIN_DISTANCE_MI)
+    factors = np.asarray(factors, dtype=np.float64)
+    keep = factors > 0
+    d, log_f = distance[keep], np.log(factors[keep])
+
+    columns = {"a": np.ones_like(d), "b": -np.log(d), "c": -d}
+    names = {"gamma": ["a", "b", "c"], "exponential": ["a", "c"], "power": ["a", "b"]}[kind]
+    if keep.sum() < len(names):
+        raise ValueError(f"Need at least {len(names)} non-zero factors to fit a {kind} curve")
+    coef, *_ = np.linalg.lstsq(np.column_stack([columns[n] for n in names]), log_f, rcond=None)
+    params = dict(zip(names, coef.tolist()))
+    params["a"] = float(np.exp(params["a"]))
+    return params
+
+
+@lru_cache(maxsize=64)
+def _lookup_table(kind, param_items, max_distance, step):
+    grid = np.arange(int(round(max_distance / step)) + 1) * step
+    return evaluate(kind, grid, dict(param_items)).astype(np.float32)
+
+
+def friction_matrix(kind, distance, params, step=LOOKUP_STEP_MI):
+    """float32 friction for every cell of ``distance``, via the cached lookup table.
+
+    Cells are rounded to the nearest ``step`` miles.
+    """
+    distance = np.asarray(distance)
+    max_distance = float(np.ceil(max(float(distance.max()), 1.0) / 10) * 10)  # stable cache key
+    table = _lookup_table(kind, tuple(sorted(params.items())), max_distance, step)
+    idx = np.rint(distance * (1 / step)).astype(np.int32)
+    return table[idx]
+
+
+def is_monotonic_decreasing(kind, params, max_distance=QA_MAX_DISTANCE_MI, step=0.1):
+    """QA: the curve never rises between ``MIN_DISTANCE_MI`` and ``max_distance``."""
+    curve = evaluate(kind, np.arange(MIN_DISTANCE_MI, max_distance + step, step), params)
+    return bool(np.all(np.diff(curve) <= 0))
+
+
+def save_functions(functions, path=FRICTION_FUNCTIONS_PATH):
+    """Write ``{curve: {"function": kind, "params": {...}}}`` as JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(functions, indent=2))
+
+
+def load_functions(path=FRICTION_FUNCTIONS_PATH):
+    functions = json.loads(Path(path).read_text())
+    for curve, spec in functions.items():
+        if spec["function"] not in FUNCTIONS:
+            raise ValueError(f"Unknown friction function {spec['function']!r} for {curve} in {path}")
+    return functions
@@ -0,0 +1,108 @@
+"""Columnar geometry metrics shared by the adjustment and QA scripts.
+
+``geometry_metrics(gdf)`` computes area, perimeter, centroid and
+representative point for every row in one vectorized pass and memoizes the
+result per geometry column, so asking again (for the X and then the Y of a
+centroid, or for area and then centroid shift) costs nothing.
+
+A memo entry is only reused while the column holds the very same geometry
+objects it was computed from. Shapely geometries are immutable, so an
+in-place edit (``gdf.loc[i, "geometry"] = ...``) swaps in a new object and the
+metrics are recomputed. Checking that is one pass over object ids, much cheaper
+than hashing coordinates. Every call returns its own DataFrame, so changing
+the result never touches the memo. ``refresh=True`` forces a recompute.
+
+All lengths are in CRS units (feet for the NJ State Plane projections used
+across the repo); areas are also reported in acres.
+"""
+import weakref
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+SQFT_PER_ACRE = 43560
+METRIC_COLUMNS = [
+    "area_ft2", "area_acres", "perimeter_ft", "centroid_x", "centroid_y", "rep_x", "rep_y"
+]
+
+_memo = {}
+
+
+def _geometry_values(data):
+    if isinstance(data, gpd.GeoDataFrame):
+        return data.geometry.values
+    if isinstance(data, gpd.GeoSeries):
+        return data.values
+    raise TypeError(f"expected a GeoDataFrame or GeoSeries, got {type(data).__name__}")
+
+
+def _compute(geoms):
+    centroids = shapely.centroid(geoms)
+    rep_points = shapely.point_on_surface(geoms)
+    area = shapely.area(geoms)
+    return {
+        "area_ft2": area,
+        "area_acres": area / SQFT_PER_ACRE,
+        "perimeter_ft": shapely.length(geoms),
+        "centroid_x": shapely.get_x(centroids),
+        "centroid_y": shapely.get_y(centroids),
+        "rep_x": shapely.get_x(rep_points),
+        "rep_y": shapely.get_y(rep_points),
+    }
+
+
+def _object_ids(geoms):
+    return np.fromiter(map(id, geoms), dtype=np.int64, count=len(geoms))
+
+
+def geometry_metrics(data, refresh=False):
+    """Return a DataFrame of ``METRIC_COLUMNS`` aligned to ``data``'s index."""
+    values = _geometry_values(data)
+    geoms = np.asarray(values, dtype=object)
+    key = id(values)
+    entry = _memo.get(key)
+    if refresh or entry is None or not np.array_equal(entry["ids"], _object_ids(geoms)):
+        if entry is None:
+            weakref.finalize(values, _memo.pop, key, None)
+        # The snapshot keeps the geometries alive, so their ids cannot be reused
+        snapshot = geoms.copy()
+        entry = _memo[key] = {"geoms": snapshot, "ids": _object_ids(snapshot), "metrics": _compute(snapshot)}
+    return pd.DataFrame(entry["metrics"], index=data.index, copy=True)
+
+
+def centroid_points(data):
+    """Centroids as a GeoSeries, built from the memoized X/Y columns."""
+    m = geometry_metrics(data)
+    return gpd.GeoSeries(
+        shapely.points(m["centroid_x"].to_numpy(), m["centroid_y"].to_numpy()),
+        index=data.index,
+        crs=data.crs,
+    )
+
+
+def centroid_shift(data, baseline, on):
+    """Distance from each row's centroid to its baseline feature's centroid.
+
+    ``baseline`` is matched to ``data`` on the ``on`` key column (e.g. each
+    adjusted piece to its 2011 TAZ). Rows with no baseline match get NaN.
+    Duplicate keys in ``baseline`` resolve to the first occurrence.
+    """
+    m = geometry_metrics(data)
+    b = geometry_metrics(baseline)
+    b_index = pd.Index(baseline[on]).drop_duplicates(keep="first")
+    first = ~pd.Index(baseline[on]).duplicated(keep="first")
+    pos = b_index.get_indexer(data[on])  # -1 (no match) picks the trailing NaN below
+    bx = np.append(b["centroid_x"].to_numpy()[first], np.nan)[pos]
+    by = np.append(b["centroid_y"].to_numpy()[first], np.nan)[pos]
+    return pd.Series(
+        np.hypot(m["centroid_x"].to_numpy() - bx, m["centroid_y"].to_numpy() - by),
+        index=data.index,
+    )
+
+
+def point_distance(x1, y1, x2, y2):
+    """Element-wise distance between two sets of point coordinates."""
+    return np.hypot(np.asarray(x1, dtype=float) - np.asarray(x2, dtype=float),
+                    np.asarray(y1, dtype=float) - np.asarray(y2, dtype=float))
@@ -0,0 +1,152 @@
+"""Single-file, memory-mapped store for zone x zone matrices.
+
+Skims, friction matrices and trip tables are kept as named *cores* (``"DIST"``,
+``"HBW"``, ``"HBW_AM"`` ...) in one ``.odm`` file with this layout::
+
+    b"SJTDMODM" | header length (8 bytes, little-endian) | JSON header | cores
+
+The header holds the TAZ_ID of every row / column and, for each core, its
+dtype and byte offset. Cores are raw C-ordered arrays aligned to 64 bytes, so
+a reader maps them with ``np.memmap`` and touches only the pages it slices:
+
+    store = MatrixStore("outputs/trip_tables.odm")
+    store["HBW"]                            # read-only memmap, nothing loaded yet
+    store.rows("HBW", [101, 102])           # two origin rows
+    store.columns("HBW", [9123])            # one destination column
+    store.submatrix("HBW", [101, 102, 103])  # 3 x 3 block, by TAZ_ID
+
+Files are written row block by row block, so a core that is itself a memmap
+is never fully loaded. The write goes to a temp file that replaces the target
+at the end.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"SJTDMODM"
+FORMAT_VERSION = 1
+ALIGN = 64
+WRITE_BLOCK_BYTES = 64 << 20
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def _zone_list(zones):
+    zones = pd.Series(np.asarray(zones))
+    if zones.duplicated().any():
+        raise ValueError(f"Duplicate zone IDs: {zones[zones.duplicated()].tolist()[:10]}")
+    if pd.api.types.is_integer_dtype(zones):
+        return "int64", zones.astype("int64").tolist()
+    return "str", zones.astype(str).tolist()
+
+
+def write_matrix_store(path, zones, cores, dtype=None):
+    """Write ``cores`` (``{name: zones x zones array}``) to a new store at ``path``.
+
+    ``dtype`` overrides every core's dtype (e.g. ``"float32"``).
+    """
+    path = Path(path)
+    zone_dtype, zone_list = _zone_list(zones)
+    n = len(zone_list)
+
+    layout, offset = {}, 0
+    for name, core in cores.items():
+        if core.shape != (n, n):
+            raise ValueError(f"Core {name!r} is {core.shape}, expected ({n}, {n}) for {n} zones")
+        core_dtype = np.dtype(dtype or core.dtype)
+        layout[name] = {"dtype": core_dtype.str, "offset": offset}
+        offset = _aligned(offset + n * n * core_dtype.itemsize)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "zone_dtype": zone_dtype,
+        "zones": zone_list,
+        "cores": layout,
+    }).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, core in cores.items():
+            core_dtype = np.dtype(layout[name]["dtype"])
+            f.seek(data_start + layout[name]["offset"])
+            step = max(1, WRITE_BLOCK_BYTES // max(1, n * core_dtype.itemsize))
+            for start in range(0, n, step):
+                f.write(np.ascontiguousarray(core[start:start + step], dtype=core_dtype).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+class MatrixStore:
+    """Read-only view of a ``.odm`` store; cores are memory-mapped on first access."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a matrix store")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len))
+        if header["version"] > FORMAT_VERSION:
+            raise ValueError(f"{self.path} uses store format v{header['version']} (this reader: v{FORMAT_VERSION})")
+
+        self.zones = np.asarray(header["zones"], dtype=np.int64 if header["zone_dtype"] == "int64" else str)
+        self.zone_index = pd.Index(self.zones)
+        self._layout = header["cores"]
+        self._data_start = _aligned(len(MAGIC) + 8 + header_len)
+        self._maps = {}
+
+    @property
+    def names(self):
+        return list(self._layout)
+
+    def __contains__(self, name):
+        return name in self._layout
+
+    def __getitem__(self, name):
+        if name not in self._layout:
+            raise KeyError(f"No core {name!r} in {self.path} (cores: {', '.join(self._layout)})")
+        if name not in self._maps:
+            n = len(self.zones)
+            self._maps[name] = np.memmap(
+                self.path,
+                dtype=np.dtype(self._layout[name]["dtype"]),
+                mode="r",
+                offset=self._data_start + self._layout[name]["offset"],
+                shape=(n, n),
+            )
+        return self._maps[name]
+
+    def positions(self, zones):
+        """Row / column positions of TAZ_IDs ``zones`` (``KeyError`` for unknown zones)."""
+        # Look up as objects: casting to the stored "<U{n}" dtype would truncate longer IDs
+        pos = self.zone_index.get_indexer(pd.Index(np.atleast_1d(zones)).astype(object))
+        if (pos < 0).any():
+            missing = np.atleast_1d(zones)[pos < 0].tolist()
+            raise KeyError(f"Zones not in {self.path.name}: {missing[:10]}")
+        return pos
+
+    def rows(self, name, zones):
+        """Origin rows for ``zones`` (all destinations)."""
+        return self[name][self.positions(zones)]
+
+    def columns(self, name, zones):
+        """Destination columns for ``zones`` (all origins)."""
+        return self[name][:, self.positions(zones)]
+
+    def submatrix(self, name, origins, destinations=None):
+        """``origins`` x ``destinations`` block (square on ``origins`` by default)."""
+        rows = self.positions(origins)
+        cols = rows if destinations is None else self.positions(destinations)
+        return self[name][np.ix_(rows, cols)]
+
+    def load(self, name):
+        """A writable in-memory copy of one core."""
+        return np.array(self[name])
@@ -0,0 +1,352 @@
+"""Incremental runner for the trip-model scripts.
+
+Each stage is one standalone script plus the files it reads and writes. A
+stage depends on whichever stage writes one of its inputs, which gives the
+DAG. Every stage is fingerprinted by the SHA-256 of its script and inputs.
+A stage is rerun only when that fingerprint changes, or when one of its
+outputs is missing or was changed outside the pipeline. Otherwise it is
+skipped.
+
+Stages are scheduled as soon as everything upstream has finished, and
+independent stages run side by side in a thread pool (each script runs in
+its own process). Staleness is decided when a stage becomes ready. If an
+upstream stage reruns and writes byte-identical outputs, everything
+downstream is still skipped.
+
+Usage::
+
+    python pipeline.py                    # every stale stage
+    python pipeline.py qa_dashboard       # one stage and whatever it needs
+    python pipeline.py --force tripgen    # rerun regardless of fingerprints
+    python pipeline.py --dry-run          # list what would run
+    python pipeline.py --taz-layer D:/gis/2020TAZsV9_with_centroids.parquet
+
+Inputs that come from outside the repository (the adjusted TAZ layer on the
+J: drive) are listed under a stage's ``requires``. When one is missing, that
+stage is reported as unavailable and not run, and so is every stage that
+needs its outputs. The rest of the pipeline still runs and the exit status
+stays 0. If the stage's outputs are already there from an earlier run, they
+are kept and downstream stages use them.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from taz_digest import CACHE_DIR, cached_file_digest
+
+ROOT = Path(__file__).resolve().parent
+STATE_PATH = CACHE_DIR / "pipeline.json"
+PIPELINE_VERSION = 1
+
+# Adjusted TAZ layer read by build_skims.py. Override with the SJTDM_ADJUSTED_TAZ
+# environment variable or --taz-layer; the stage script sees the same variable.
+ADJUSTED_TAZ_ENV = "SJTDM_ADJUSTED_TAZ"
+ADJUSTED_TAZ_PATH = os.environ.get(ADJUSTED_TAZ_ENV, r"J:\TAZ_Adustment\Output\2020TAZsV9_with_centroids.parquet")
+
+# === Stage declarations (paths relative to the repository root) ===
+STAGES = {
+    "taz_inputs": {
+        "script": "taz_inputs.py",
+        "inputs": [],
+        "outputs": ["outputs/taz_inputs.csv"],
+    },
+    "special_generators": {
+        "script": "special_generators.py",
+        "inputs": [],
+        "outputs": ["outputs/special_generators.csv"],
+    },
+    "tripgen": {
+        "script": "tripgen.py",
+        "inputs": [
+            "trip_generation.py",
+            "inputs/taz_forecasts.csv",
+            "inputs/trip_rates.csv",
+            "outputs/special_generators.csv",
+        ],
+        "outputs": ["outputs/panda.csv", "outputs/panda_with_specials.csv"],
+    },
+    "qa_tripgen": {
+        "script": "qa_tripgen.py",
+        "inputs": ["trip_qa.py", "outputs/panda.csv"],
+        "outputs": [],  # outputs/qa/*.csv are only written when a check fails
+    },
+    "qa_dashboard": {
+        "script": "qa_dashboard.py",
+        "inputs": ["trip_qa.py", "outputs/panda.csv"],
+        "outputs": ["outputs/qa/qa_summary.txt"],
+    },
+    "skims": {
+        "script": "build_skims.py",
+        "inputs": ["taz_skims.py", "matrix_store.py", ADJUSTED_TAZ_PATH],
+        "requires": [ADJUSTED_TAZ_PATH],
+        "outputs": ["outputs/skims/skims.odm"],
+    },
+    "tripdist": {
+        "script": "tripdist.py",
+        "inputs": [
+            "trip_distribution.py",
+            "friction_functions.py",
+            "matrix_store.py",
+            "outputs/panda.csv",
+            "outputs/gravity_friction_factors.csv",
+            "outputs/friction_functions.json",
+            "outputs/skims/skims.odm",
+        ],
+        "outputs": ["outputs/trip_tables.odm"],
+    },
+    "tripbalance": {
+        "script": "tripbalance.py",
+        "inputs": ["trip_balancing.py", "matrix_store.py", "outputs/panda.csv", "outputs/trip_tables.odm"],
+        "outputs": ["outputs/trip_tables_balanced.odm"],
+    },
+    "external_trips": {
+        "script": "external_trips.py",
+        "inputs": ["external_model.py", "matrix_store.py", "inputs/external_ee_seed.csv"],
+        "outputs": ["outputs/external_trips.csv", "outputs/external_ee.odm"],
+    },
+    "tlfd_builder": {
+        "script": "tlfd_builder.py",
+        "inputs": ["friction_functions.py"],
+        "outputs": ["outputs/gravity_friction_factors.csv", "outputs/friction_functions.json"],
+    },
+}
+
+
+def upstream_stages(stages=STAGES):
+    """Map each stage to the stages that write its inputs."""
+    writers = {}
+    for name, stage in stages.items():
+        for path in stage["outputs"]:
+            if path in writers:
+                raise ValueError(f"{path} is written by both {writers[path]} and {name}")
+            writers[path] = name
+    upstream = {
+        name: sorted({writers[p] for p in stage["inputs"] if p in writers} - {name})
+        for name, stage in stages.items()
+    }
+
+    # Reject cycles up front rather than deadlocking the scheduler
+    visiting, ordered = set(), set()
+
+    def visit(name, chain):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline cycle: {' -> '.join([*chain, name])}")
+        visiting.add(name)
+        for dep in upstream[name]:
+            visit(dep, [*chain, name])
+        ordered.add(name)
+
+    for name in stages:
+        visit(name, [])
+    return upstream
+
+
+def select_stages(targets, upstream):
+    """Return ``targets`` plus everything they depend on (all stages if no targets)."""
+    if not targets:
+        return set(upstream)
+    unknown = sorted(set(targets) - set(upstream))
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)} (choose from {', '.join(upstream)})")
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(upstream[name])
+    return selected
+
+
+def _digest_or_none(path):
+    path = ROOT / path
+    return cached_file_digest(path) if path.exists() else None
+
+
+def missing_requirements(stage):
+    """The stage's ``requires`` paths that do not exist."""
+    return [p for p in stage.get("requires", []) if not (ROOT / p).exists()]
+
+
+def stage_fingerprint(stage):
+    """SHA-256 of a stage's script and input files (missing inputs hash as absent)."""
+    digest = hashlib.sha256(f"pipeline_stage/v{PIPELINE_VERSION}".encode())
+    for path in [stage["script"], *stage["inputs"]]:
+        digest.update(f"{path}={_digest_or_none(path)}\n".encode())
+    return digest.hexdigest()
+
+
+def stale_reason(stage, record):
+    """Why ``stage`` must run given its last recorded run, or ``None`` if it is current."""
+    if record is None:
+        return "never run"
+    if record["fingerprint"] != stage_fingerprint(stage):
+        return "script or inputs changed"
+    for path in stage["outputs"]:
+        sha = _digest_or_none(path)
+        if sha is None:
+            return f"{path} is missing"
+        if sha != record["outputs"].get(path):
+            return f"{path} was modified"
+    return None
+
+
+def load_state(path=STATE_PATH):
+    try:
+        return json.loads(Path(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(state, indent=1))
+    os.replace(tmp_path, path)
+
+
+def run_script(script):
+    """Run one stage script from the repository root and capture its console output."""
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, script], cwd=ROOT, env=env, capture_output=True, text=True, encoding="utf-8"
+    )
+    return proc.returncode, proc.stdout + proc.stderr, time.perf_counter() - started
+
+
+def _print_log(text):
+    for line in text.rstrip().splitlines():
+        print(f"    {line}")
+
+
+def run_pipeline(targets=None, force=False, max_workers=None, dry_run=False, stages=STAGES):
+    """Run every stale stage in ``targets`` (plus upstream), independent stages concurrently.
+
+    Returns ``{stage: status}`` with status ``"ran"``, ``"skipped"``,
+    ``"failed"``, ``"blocked"`` (an upstream stage failed) or
+    ``"unavailable"`` (a required input is missing, here or upstream).
+    """
+    upstream = upstream_stages(stages)
+    selected = select_stages(targets, upstream)
+    state = load_state()
+    status = {}
+
+    def unavailable(name):
+        """Settle ``name`` if it cannot run for want of a required input; True if settled."""
+        waiting_on = [d for d in upstream[name] if status.get(d) == "unavailable"]
+        if waiting_on:
+            status[name] = "unavailable"
+            print(f"⏸️ {name}: not run, needs {', '.join(waiting_on)}")
+            return True
+        missing = missing_requirements(stages[name])
+        if not missing:
+            return False
+        if all((ROOT / p).exists() for p in stages[name]["outputs"]):
+            status[name] = "skipped"
+            print(f"⏭️ {name}: {', '.join(missing)} not found; keeping the existing outputs")
+        else:
+            status[name] = "unavailable"
+            print(f"⏸️ {name}: not run, {', '.join(missing)} not found")
+        return True
+
+    if dry_run:
+        # Assume every rerun changes its outputs, so staleness flows downstream
+        pending = set(selected)
+        while pending:
+            for name in sorted(n for n in pending if all(d in status for d in upstream[n])):
+                pending.discard(name)
+                if unavailable(name):
+                    continue
+                reason = "forced" if force else stale_reason(stages[name], state.get(name))
+                if reason is None and any(status[d] == "ran" for d in upstream[name]):
+                    reason = "upstream stage will rerun"
+                status[name] = "ran" if reason else "skipped"
+                print(f"{'▶️' if reason else '⏭️'} {name}: {reason or 'up to date'}")
+        return status
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(selected)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running, fingerprints = {}, {}
+        while len(status) < len(selected):
+            ready = sorted(
+                n for n in selected
+                if n not in status and n not in running.values()
+                and all(status.get(d) in ("ran", "skipped", "unavailable") for d in upstream[n])
+            )
+            for name in sorted(n for n in selected if n not in status):
+                if any(status.get(d) in ("failed", "blocked") for d in upstream[name]):
+                    status[name] = "blocked"
+                    print(f"⛔ {name}: not run, an upstream stage failed")
+
+            for name in ready:
+                if name in status or unavailable(name):
+                    continue
+                stage = stages[name]
+                reason = "forced" if force else stale_reason(stage, state.get(name))
+                if reason is None:
+                    status[name] = "skipped"
+                    print(f"⏭️ {name}: up to date")
+                    continue
+                print(f"▶️ {name}: {reason}")
+                fingerprints[name] = stage_fingerprint(stage)
+                running[pool.submit(run_script, stage["script"])] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                stage = stages[name]
+                returncode, log, seconds = future.result()
+                _print_log(log)
+                missing = [p for p in stage["outputs"] if not (ROOT / p).exists()]
+                if returncode != 0 or missing:
+                    status[name] = "failed"
+                    state.pop(name, None)
+                    detail = f"exit code {returncode}" if returncode else f"did not write {', '.join(missing)}"
+                    print(f"❌ {name} failed ({detail})")
+                else:
+                    status[name] = "ran"
+                    state[name] = {
+                        "fingerprint": fingerprints[name],
+                        "outputs": {p: _digest_or_none(p) for p in stage["outputs"]},
+                    }
+                    print(f"✅ {name} finished in {seconds:.1f}s")
+                save_state(state)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the trip-model stages that are out of date.")
+    parser.add_argument("targets", nargs="*", help=f"stages to bring up to date (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--force", action="store_true", help="rerun the selected stages even if up to date")
+    parser.add_argument("--workers", type=int, default=None, help="maximum stages to run at once")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    parser.add_argument("--taz-layer", default=None,
+                        help=f"adjusted TAZ layer for the skims stage (default: ${ADJUSTED_TAZ_ENV} or {ADJUSTED_TAZ_PATH})")
+    args = parser.parse_args()
+
+    if args.taz_layer:
+        os.environ[ADJUSTED_TAZ_ENV] = args.taz_layer  # inherited by build_skims.py
+        for stage in STAGES.values():
+            stage["inputs"] = [args.taz_layer if p == ADJUSTED_TAZ_PATH else p for p in stage["inputs"]]
+            stage["requires"] = [args.taz_layer if p == ADJUSTED_TAZ_PATH else p for p in stage.get("requires", [])]
+
+    try:
+        result = run_pipeline(args.targets, force=args.force, max_workers=args.workers, dry_run=args.dry_run)
+    except ValueError as err:
+        parser.error(str(err))
+
+    counts = {s: sum(v == s for v in result.values()) for s in ("ran", "skipped", "failed", "blocked", "unavailable")}
+    print(f"\n📋 Pipeline: {counts['ran']} {'would run' if args.dry_run else 'ran'}, {counts['skipped']} up to date, "
+          f"{counts['failed']} failed, {counts['blocked']} blocked, {counts['unavailable']} unavailable")
+    sys.exit(1 if counts["failed"] or counts["blocked"] else 0)
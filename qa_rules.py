@@ -0,0 +1,142 @@
+"""Vectorized QA rules for the TAZ_QA_V*.py scripts.
+
+Every rule is evaluated once over the whole merged 2011/2020 frame as a boolean
+mask. Each failing rule sets its own bit in ``FlagCode``, and the ``Flag`` text
+("AreaMismatch|CentroidMismatch", "OK", ...) is built once per distinct code
+instead of once per row.
+
+Thresholds live in ``inputs/qa_thresholds.json``:
+
+    {"area_diff_pct": 5, "centroid_shift_ft": 500}
+
+Keys that are left out fall back to ``DEFAULT_THRESHOLDS``. To compare several
+runs under different tolerances, point the QA script at a different config file.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+QA_CONFIG_PATH = Path(__file__).resolve().parent / "inputs" / "qa_thresholds.json"
+DEFAULT_THRESHOLDS = {
+    "area_diff_pct": 5,        # flag when |Area20 - Area11| / Area11 exceeds this (percent)
+    "centroid_shift_ft": 500,  # flag when the centroid moves further than this (CRS units)
+}
+
+# Flag name and bit, in the order the names are joined in ``Flag``
+RULES = [
+    ("Missing_in_2011", 1),
+    ("Missing_in_2020", 2),
+    ("AreaMismatch", 4),
+    ("CentroidMismatch", 8),
+]
+
+
+def load_thresholds(path=QA_CONFIG_PATH):
+    """Read QA thresholds from a JSON file, filling gaps from ``DEFAULT_THRESHOLDS``."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    path = Path(path)
+    if not path.exists():
+        print(f"ℹ️ No QA config at {path}; using default thresholds {thresholds}")
+        return thresholds
+
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(DEFAULT_THRESHOLDS)
+    if unknown:
+        raise ValueError(f"Unknown QA threshold(s) in {path}: {sorted(unknown)}")
+    thresholds.update({key: float(value) for key, value in overrides.items()})
+    return thresholds
+
+
+def area_diff_pct(area_20, area_11, skip_zero_area20=False):
+    """Absolute percent area change; NaN where either area is missing or Area11 is 0.
+
+    ``skip_zero_area20=True`` also gives NaN (no ``AreaMismatch``) where Area20
+    is 0, as TAZ_QA_V1's ``if area_11 and area_20`` check did. V2-V4 only
+    required Area11 > 0, so a 2020 zone with no area shows as a 100% change.
+    """
+    area_20 = pd.to_numeric(area_20, errors="coerce").to_numpy(dtype=float)
+    area_11 = pd.to_numeric(area_11, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.abs((area_20 - area_11) / area_11 * 100)
+    valid = area_11 > 0
+    if skip_zero_area20:
+        valid &= area_20 > 0
+    return np.where(valid, pct, np.nan)
+
+
+def centroid_distance(cent_20, cent_11):
+    """Element-wise centroid distance; NaN where either centroid is missing."""
+    return shapely.distance(
+        np.asarray(cent_20, dtype=object), np.asarray(cent_11, dtype=object)
+    ).astype(float)
+
+
+def flag_labels(codes):
+    """Turn a ``FlagCode`` array into "Name|Name" strings ("OK" for 0)."""
+    codes = pd.Series(codes)
+    labels = {
+        code: "|".join(name for name, bit in RULES if code & bit) or "OK"
+        for code in codes.unique()
+    }
+    return codes.map(labels).to_numpy()
+
+
+def evaluate(
+    merged,
+    thresholds=None,
+    area_cols=("Area20", "Area11"),
+    centroid_cols=("Cent20", "Cent11"),
+    merge_col="_merge",
+    skip_zero_area20=False,
+    diff_decimals=None,
+    dist_decimals=None,
+):
+    """Apply every QA rule to ``merged`` (the outer merge with ``indicator=True``).
+
+    Returns a DataFrame aligned to ``merged`` with ``Flag``, ``FlagCode``,
+    ``DiffPct`` and ``CentDist``. Area and centroid rules only apply to
+    records found in both years. ``skip_zero_area20`` is passed to
+    ``area_diff_pct``.
+
+    ``diff_decimals`` / ``dist_decimals`` round ``DiffPct`` / ``CentDist``
+    before they are compared with the thresholds, as TAZ_QA_V4 did (2 and 1
+    decimals), so a value that rounds down to the threshold is not flagged.
+    Left as None, the unrounded values are compared, as in V1-V3.
+    """
+    if thresholds is None:
+        thresholds = load_thresholds()
+
+    status = merged[merge_col].astype(str).to_numpy()
+    matched = status == "both"
+    diff_pct = np.where(matched, area_diff_pct(merged[area_cols[0]], merged[area_cols[1]], skip_zero_area20), np.nan)
+    cent_dist = np.where(
+        matched, centroid_distance(merged[centroid_cols[0]], merged[centroid_cols[1]]), np.nan
+    )
+    if diff_decimals is not None:
+        diff_pct = np.round(diff_pct, diff_decimals)
+    if dist_decimals is not None:
+        cent_dist = np.round(cent_dist, dist_decimals)
+
+    masks = {
+        "Missing_in_2011": status == "left_only",
+        "Missing_in_2020": status == "right_only",
+        "AreaMismatch": diff_pct > thresholds["area_diff_pct"],
+        "CentroidMismatch": cent_dist > thresholds["centroid_shift_ft"],
+    }
+    codes = np.zeros(len(merged), dtype=np.int64)
+    for name, bit in RULES:
+        codes |= np.where(masks[name], bit, 0)
+
+    return pd.DataFrame(
+        {
+            "Flag": flag_labels(codes),
+            "FlagCode": codes,
+            "DiffPct": diff_pct,
+            "CentDist": cent_dist,
+        },
+        index=merged.index,
+    )
@@ -0,0 +1,208 @@
+"""Batch trip generation + QA for many forecast scenarios in worker processes.
+
+Usage::
+
+    python scenario_batch.py                          # inputs/scenarios.csv
+    python scenario_batch.py my_manifest.csv --workers 8
+
+The manifest has one row per scenario:
+
+    SCENARIO   name, also the output folder (letters, digits, ``_ - .``)
+    FORECASTS  PANDA-style zone forecast CSV, shaped like inputs/taz_forecasts.csv
+    RATES      optional rate table; blank = inputs/trip_rates.csv
+    SPECIALS   optional special generator CSV; blank = outputs/special_generators.csv
+
+A forecast file holds TAZ_ID plus exactly one column per rate variable
+(HOUSEHOLDS, EMPLOYMENT, TOURISM_SCORE with the default rates). The output
+of taz_inputs.py (STUDENTS, AREA_TYPE, no TOURISM_SCORE) is not a forecast
+file: there is no rate for those fields. Every forecast file is checked
+before any scenario starts, and a mismatch stops the batch with an error
+naming the file and its columns.
+
+Paths are relative to the repository root. The shared rate table and
+special generators are read once in the parent and handed to each worker
+process once, when it starts. Only the scenario's own forecasts are read
+per task. Each scenario writes ``panda.csv``, ``panda_with_specials.csv``
+and its ``qa/`` files under ``outputs/scenarios/<SCENARIO>/``. A one-row-per-
+scenario ``scenario_summary.csv`` sits next to them.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from trip_generation import (
+    RATES_PATH,
+    ROOT,
+    SPECIAL_ATTRACTION_FIELD,
+    apply_special_generators,
+    generate_trips,
+    load_rates,
+)
+from trip_qa import panda_checks, summary_lines, write_checks, write_summary
+
+MANIFEST_PATH = ROOT / "inputs" / "scenarios.csv"
+SPECIALS_PATH = ROOT / "outputs" / "special_generators.csv"
+SCENARIO_ROOT = ROOT / "outputs" / "scenarios"
+
+TAZ_INPUTS_ONLY_COLUMNS = {"STUDENTS", "AREA_TYPE"}  # written by taz_inputs.py, not rate variables
+
+# Shared read-only inputs, set once per worker process by _init_worker
+_shared = {}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    manifest = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for col in ["RATES", "SPECIALS"]:
+        if col not in manifest.columns:
+            manifest[col] = ""
+    bad = [s for s in manifest["SCENARIO"] if not re.fullmatch(r"[\w.-]+", s)]
+    if bad:
+        raise ValueError(f"Scenario names must be letters, digits, '_', '-' or '.': {bad}")
+    dupes = manifest["SCENARIO"][manifest["SCENARIO"].duplicated()].tolist()
+    if dupes:
+        raise ValueError(f"Duplicate scenario names in {path}: {dupes}")
+    return manifest
+
+
+def check_forecast_columns(columns, variables, path):
+    """Raise ``ValueError`` unless ``columns`` are TAZ_ID plus exactly the rate ``variables``."""
+    columns = list(columns)
+    missing = [v for v in ["TAZ_ID", *variables] if v not in columns]
+    extra = [c for c in columns if c != "TAZ_ID" and c not in variables]
+    if not missing and not extra:
+        return
+    problems = []
+    if missing:
+        problems.append(f"missing {', '.join(missing)}")
+    if extra:
+        problems.append(f"no trip rate for {', '.join(extra)}")
+    message = f"{path}: {'; '.join(problems)}."
+    if TAZ_INPUTS_ONLY_COLUMNS & set(columns):
+        message += (
+            " This looks like taz_inputs.py output; scenarios need PANDA-style forecasts"
+            f" (TAZ_ID, {', '.join(variables)})."
+        )
+    raise ValueError(message)
+
+
+def validate_manifest(manifest, rates):
+    """Check every scenario's forecast file against its rate table before anything runs."""
+    problems = []
+    for r in manifest.itertuples(index=False):
+        path = ROOT / r.FORECASTS
+        if not path.exists():
+            problems.append(f"{r.SCENARIO}: {path} not found.")
+            continue
+        variables = list(load_rates(ROOT / r.RATES).index if r.RATES else rates.index)
+        try:
+            check_forecast_columns(pd.read_csv(path, nrows=0).columns, variables, path)
+        except ValueError as err:
+            problems.append(f"{r.SCENARIO}: {err}")
+    if problems:
+        raise ValueError("Invalid scenario forecasts:\n  " + "\n  ".join(problems))
+
+
+def _init_worker(rates, specials):
+    _shared["rates"] = rates
+    _shared["specials"] = specials
+
+
+def run_scenario(scenario, forecasts_path, rates_path="", specials_path="", output_root=SCENARIO_ROOT):
+    """Generate, apply special generators and QA one scenario. Returns its summary row."""
+    started = time.perf_counter(), time.process_time()
+    rates = load_rates(ROOT / rates_path) if rates_path else _shared["rates"]
+    specials = pd.read_csv(ROOT / specials_path) if specials_path else _shared["specials"]
+
+    out_dir = Path(output_root) / scenario
+    qa_folder = out_dir / "qa"
+    qa_folder.mkdir(parents=True, exist_ok=True)
+
+    forecasts = pd.read_csv(ROOT / forecasts_path)
+    check_forecast_columns(forecasts.columns, list(rates.index), ROOT / forecasts_path)
+    panda = generate_trips(forecasts, rates)
+    panda.to_csv(out_dir / "panda.csv", index=False)
+
+    with_specials, added, new = panda, 0, 0
+    if specials is not None:
+        with_specials, summary = apply_special_generators(
+            panda, specials, SPECIAL_ATTRACTION_FIELD, trip_fields=rates.columns
+        )
+        summary.to_csv(qa_folder / "special_generator_summary.csv", index=False)
+        added, new = int((summary["STATUS"] == "added").sum()), int((summary["STATUS"] == "new").sum())
+    with_specials.to_csv(out_dir / "panda_with_specials.csv", index=False)
+
+    counts = write_checks(panda_checks(panda), str(qa_folder))
+    write_summary(summary_lines(panda), qa_folder / "qa_summary.txt")
+
+    return {
+        "SCENARIO": scenario,
+        "ZONES": len(panda),
+        **panda[list(rates.columns)].sum().round(1).to_dict(),
+        "SPECIAL_ZONES_ADDED": added,
+        "SPECIAL_ZONES_NEW": new,
+        **{f"QA_{name.upper()}": n for name, n in counts.items()},
+        "WALL_S": round(time.perf_counter() - started[0], 3),
+        "CPU_S": round(time.process_time() - started[1], 3),
+    }
+
+
+def run_batch(manifest, max_workers=None, output_root=SCENARIO_ROOT):
+    """Run every manifest row in a process pool.
+
+    Raises ``ValueError`` before starting when a forecast file is missing or
+    does not match its rate table (see ``validate_manifest``).
+
+    Returns ``(summary, failed)``: one summary row per finished scenario, in
+    manifest order, and ``{scenario: error}`` for the ones that raised.
+    """
+    rates = load_rates(RATES_PATH)
+    validate_manifest(manifest, rates)
+    specials = pd.read_csv(SPECIALS_PATH) if SPECIALS_PATH.exists() else None
+    if specials is None:
+        print(f"⚠️ No {SPECIALS_PATH.name} found — scenarios without their own SPECIALS skip the merge.")
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(manifest)))
+    print(f"🚀 Running {len(manifest)} scenarios on {workers} worker processes...")
+    rows, failed = {}, {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rates, specials)) as pool:
+        futures = {
+            pool.submit(run_scenario, r.SCENARIO, r.FORECASTS, r.RATES, r.SPECIALS, output_root): r.SCENARIO
+            for r in manifest.itertuples(index=False)
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                rows[name] = future.result()
+                print(f"  ✅ {name}: {rows[name]['ZONES']} zones in {rows[name]['WALL_S']:.2f}s")
+            except Exception as err:  # one bad scenario should not sink the sweep
+                failed[name] = f"{type(err).__name__}: {err}"
+                print(f"  ❌ {name}: {failed[name]}")
+
+    summary = pd.DataFrame([rows[s] for s in manifest["SCENARIO"] if s in rows])
+    return summary, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run trip generation and QA for every scenario in a manifest.")
+    parser.add_argument("manifest", nargs="?", default=MANIFEST_PATH, help="scenario manifest CSV")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    print("Scenario Batch Runner Starting...")
+    try:
+        summary, failed = run_batch(load_manifest(args.manifest), max_workers=args.workers)
+    except ValueError as err:
+        print(f"❌ {err}")
+        sys.exit(1)
+
+    SCENARIO_ROOT.mkdir(parents=True, exist_ok=True)
+    summary_path = SCENARIO_ROOT / "scenario_summary.csv"
+    summary.to_csv(summary_path, index=False)
+    print(f"\n📋 {len(summary)} scenarios done, {len(failed)} failed. Summary saved to {summary_path}")
+    sys.exit(1 if failed else 0)
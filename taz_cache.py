@@ -0,0 +1,159 @@
+"""Persistent, content-addressed caches for the TAZ adjustment scripts.
+
+``read_projected`` keeps every input layer on disk as GeoParquet already
+projected to the working CRS, so a warm start skips both the shapefile parse
+and PROJ. ``cached_intersection`` stores the TAZ x CBG intersection table.
+
+Source files are fingerprinted by SHA-256 through ``taz_digest``, so an
+unchanged input is never re-hashed and a touched or replaced one always is.
+
+Intersection table
+------------------
+
+The first script to need an intersection computes it once with
+``keep_geom_type=False`` (every piece, including boundary slivers) and stores
+the pieces as GeoParquet with just the two ID columns. Later runs, from any
+script, read the stored table instead of redoing the overlay, then apply
+their own ``keep_geom_type`` rule and join back whatever attributes they need.
+
+Entries are keyed by a SHA-256 of:
+  - the bytes of every source file (all shapefile sidecars included),
+  - the working CRS and the TAZ / CBG ID column names,
+  - the set of IDs actually passed in, so a county-filtered layer and the
+    full statewide layer never share an entry.
+
+Anything upstream changing (a re-exported shapefile, a different CRS, a new
+county filter) therefore produces a new key and a fresh overlay.
+"""
+import hashlib
+import warnings
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import CRS
+
+from taz_digest import CACHE_DIR, cached_file_digest, source_files
+from taz_io import NJ_STATE_PLANE, read_layer, write_parquet
+from taz_overlay import filter_geom_type, overlay_intersection
+
+try:
+    import pyarrow  # noqa: F401  (GeoParquet backend)
+except ImportError:
+    pyarrow = None
+
+CACHE_VERSION = 1
+
+
+def _update_sources(digest, sources, cache_dir=CACHE_DIR):
+    for source in sources:
+        for path in source_files(source):
+            digest.update(path.suffix.lower().encode())
+            digest.update(cached_file_digest(path, cache_dir).encode())
+
+
+def _id_digest(values):
+    ids = np.unique(np.asarray(values).astype(str))
+    return hashlib.sha256("\n".join(ids).encode()).hexdigest()
+
+
+def intersection_key(sources, crs, taz_id, cbg_id, taz_ids, cbg_ids):
+    """Content hash identifying one TAZ x CBG intersection table."""
+    digest = hashlib.sha256(f"taz_cbg_intersection/v{CACHE_VERSION}".encode())
+    _update_sources(digest, sources)
+    digest.update(CRS.from_user_input(crs).to_wkt().encode())
+    digest.update(f"{taz_id}|{cbg_id}".encode())
+    digest.update(_id_digest(taz_ids).encode())
+    digest.update(_id_digest(cbg_ids).encode())
+    return digest.hexdigest()[:32]
+
+
+def _loader_args(kwargs):
+    """Stable text for a loader's keyword arguments (layers are reduced to bounds + CRS)."""
+    parts = []
+    for name, value in sorted(kwargs.items()):
+        if isinstance(value, (gpd.GeoDataFrame, gpd.GeoSeries)):
+            crs = value.crs.to_wkt() if value.crs is not None else None
+            value = ("bounds", [round(float(v), 6) for v in value.total_bounds], crs)
+        parts.append(f"{name}={value!r}")
+    return "|".join(parts)
+
+
+def read_projected(path, crs=NJ_STATE_PLANE, loader=read_layer, cache_dir=CACHE_DIR, **kwargs):
+    """Return ``loader(path, **kwargs)`` projected to ``crs``, cached as GeoParquet.
+
+    The entry is keyed by the source file digests, the target CRS, the loader
+    and its arguments. Change any of them and the layer is re-read and
+    re-projected.
+    """
+    if pyarrow is None:
+        warnings.warn("pyarrow is not installed; projected-input cache disabled", stacklevel=2)
+        return loader(path, **kwargs).to_crs(crs)
+
+    digest = hashlib.sha256(f"projected_layer/v{CACHE_VERSION}".encode())
+    _update_sources(digest, [path], cache_dir)
+    digest.update(CRS.from_user_input(crs).to_wkt().encode())
+    digest.update(f"{loader.__module__}.{loader.__name__}|{_loader_args(kwargs)}".encode())
+    cache_path = Path(cache_dir) / f"{Path(path).stem}_{digest.hexdigest()[:32]}.parquet"
+
+    if cache_path.exists():
+        print(f"♻️ Reusing projected {Path(path).name} ({cache_path.name})")
+        return gpd.read_parquet(cache_path)
+
+    layer = loader(path, **kwargs).to_crs(crs)
+    write_parquet(layer, cache_path)
+    return layer
+
+
+def cached_intersection(
+    taz,
+    cbg,
+    taz_id,
+    sources,
+    cbg_id="GEOID",
+    keep_geom_type=None,
+    cbg_first=False,
+    cache_dir=CACHE_DIR,
+    overlay=overlay_intersection,
+):
+    """Return the ``[taz_id, cbg_id, geometry]`` intersection of ``taz`` and ``cbg``.
+
+    ``sources`` are the files the two layers were read from. Rows come back in
+    overlay order: TAZ-major, or CBG-major with ``cbg_first=True`` (matching
+    ``gpd.overlay(cbg, taz)``). ``overlay`` is only called on a cache miss.
+    """
+    if taz.crs != cbg.crs:
+        raise ValueError(f"TAZ and CBG layers must share a CRS (got {taz.crs} and {cbg.crs})")
+
+    path = None
+    if pyarrow is None:
+        warnings.warn("pyarrow is not installed; TAZ x CBG intersection cache disabled", stacklevel=2)
+    else:
+        key = intersection_key(sources, taz.crs, taz_id, cbg_id, taz[taz_id], cbg[cbg_id])
+        path = Path(cache_dir) / f"taz_cbg_{key}.parquet"
+
+    if path is not None and path.exists():
+        print(f"♻️ Reusing cached TAZ x CBG intersection {path.name}")
+        pieces = gpd.read_parquet(path)
+    else:
+        pieces = overlay(
+            taz[[taz_id, taz.geometry.name]], cbg[[cbg_id, cbg.geometry.name]], keep_geom_type=False
+        )
+        pieces = pieces[[taz_id, cbg_id, "geometry"]]
+        if path is not None:
+            write_parquet(pieces, path)
+
+    pieces[taz_id] = pieces[taz_id].astype(taz[taz_id].dtype)
+    pieces[cbg_id] = pieces[cbg_id].astype(cbg[cbg_id].dtype)
+
+    geoms = np.asarray(pieces.geometry.values, dtype=object)
+    geoms = filter_geom_type(geoms, keep_geom_type, stacklevel=3)
+    pieces = pieces.set_geometry(geoms, crs=taz.crs)
+    pieces = pieces[~shapely.is_missing(geoms)]
+
+    taz_pos = pd.Index(taz[taz_id].drop_duplicates()).get_indexer(pieces[taz_id])
+    cbg_pos = pd.Index(cbg[cbg_id].drop_duplicates()).get_indexer(pieces[cbg_id])
+    order = np.lexsort((taz_pos, cbg_pos) if cbg_first else (cbg_pos, taz_pos))
+    return pieces.iloc[order].reset_index(drop=True)
@@ -0,0 +1,73 @@
+"""File fingerprints shared by the layer caches and the trip-model pipeline.
+
+Files are fingerprinted by SHA-256. Digests are remembered in ``digests.json``
+against each file's mtime and size, so an unchanged file is never re-hashed and
+a touched or replaced one always is. Standard library only, so the trip-model
+scripts can use it without the GIS stack.
+
+The index is rewritten through a temporary file and ``os.replace``, so readers
+never see a half-written file, and threads of one process take turns through a
+lock. An unreadable or corrupt index counts as empty. Two processes updating it
+at once can drop each other's new entries, which only costs a re-hash later.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent / "outputs" / "cache"
+DIGEST_INDEX = "digests.json"
+SHAPEFILE_SIDECARS = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+_index_lock = threading.Lock()  # one writer of digests.json at a time per process
+
+
+def source_files(path):
+    """Return every file that makes up a dataset (all sidecars for a shapefile)."""
+    path = Path(path)
+    if path.suffix.lower() == ".shp":
+        return [p for p in (path.with_suffix(ext) for ext in SHAPEFILE_SIDECARS) if p.exists()]
+    return [path]
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_index(index_path):
+    try:
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def cached_file_digest(path, cache_dir=CACHE_DIR):
+    """``file_digest`` remembered against the file's mtime and size."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    index_path = Path(cache_dir) / DIGEST_INDEX
+
+    with _index_lock:
+        entry = _read_index(index_path).get(str(path))
+    try:
+        if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["sha256"]
+    except (KeyError, TypeError):
+        pass
+
+    sha = file_digest(path)
+    with _index_lock:
+        # Re-read so entries written by other threads while hashing are kept
+        index = _read_index(index_path)
+        index[str(path)] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha}
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_name(f"{index_path.stem}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index, indent=1))
+        os.replace(tmp_path, index_path)
+    return sha
@@ -0,0 +1,140 @@
+"""Layer I/O shared by the adjustment and QA scripts.
+
+GeoParquet is the working format for every intermediate and output layer. It
+is Arrow-backed, zstd-compressed, can read just the columns you need, keeps
+full-length field names and has no 2 GB limit. Shapefiles are still accepted
+everywhere as input. Writing one is now an optional final export for
+ArcGIS users, enabled with ``export_shapefile=True``.
+
+``read_layer`` / ``write_layer`` pick the format from the file suffix, so a
+script switches formats by changing its path constant and nothing else.
+
+``read_block_groups`` applies the county filter, the bounding box and the
+column selection inside the reader itself (OGR SQL + spatial filter through
+pyogrio's Arrow path, or Parquet row-group filters). Only the block groups a
+script can actually use are parsed, so load time and memory scale with the
+SJTPO region rather than with the whole state.
+"""
+import json
+import os
+from pathlib import Path
+
+import geopandas as gpd
+import pyogrio
+
+try:
+    import pyarrow
+    import pyarrow.parquet  # GeoParquet backend and Arrow-based OGR reads
+except ImportError:
+    pyarrow = None
+
+PARQUET_SUFFIXES = {".parquet", ".geoparquet"}
+SHAPEFILE_FIELD_LIMIT = 10
+NJ_STATE_PLANE = "EPSG:3424"  # NAD83 / New Jersey (ftUS), working CRS for every script
+SJTPO_COUNTIES = ["001", "009", "011", "033"]  # Atlantic, Cape May, Cumberland, Salem
+BG_COLUMNS = ["GEOID", "COUNTYFP", "TRACTCE"]
+
+
+def is_parquet(path):
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES
+
+
+def read_layer(path, columns=None, **kwargs):
+    """Read a GeoParquet file or any OGR-readable layer (shapefile, GPKG ...).
+
+    ``columns`` limits the attribute columns read; the geometry always comes
+    along. Extra keyword arguments go to the underlying reader.
+    """
+    path = Path(path)
+    if is_parquet(path):
+        if columns is not None:
+            columns = [*columns, "geometry"] if "geometry" not in columns else list(columns)
+        return gpd.read_parquet(path, columns=columns, **kwargs)
+    return gpd.read_file(path, columns=columns, **kwargs)
+
+
+def _parquet_crs(path):
+    """CRS stored in a GeoParquet file's metadata, without reading any rows."""
+    geo = json.loads(pyarrow.parquet.read_schema(path).metadata[b"geo"])
+    return geo["columns"][geo["primary_column"]].get("crs", "OGC:CRS84")
+
+
+def layer_bounds(gdf, path):
+    """Bounds of ``gdf`` in the CRS of the layer stored at ``path``, padded by 0.1%."""
+    crs = _parquet_crs(path) if is_parquet(path) else pyogrio.read_info(path)["crs"]
+    if crs is not None and gdf.crs is not None:
+        gdf = gdf.to_crs(crs)
+    minx, miny, maxx, maxy = gdf.total_bounds
+    pad = max(maxx - minx, maxy - miny) * 0.001
+    return (minx - pad, miny - pad, maxx + pad, maxy + pad)
+
+
+def read_block_groups(path, counties=None, within=None, columns=BG_COLUMNS):
+    """Read Census block groups with the filters applied at read time.
+
+    ``counties`` keeps only those ``COUNTYFP`` codes. ``within`` is a layer
+    (e.g. the TAZs) whose bounding box limits which block groups are read; any
+    block group that can intersect it is kept. ``columns`` lists the attribute
+    columns to read (``None`` = all).
+    """
+    path = Path(path)
+    if columns is not None and counties is not None and "COUNTYFP" not in columns:
+        columns = [*columns, "COUNTYFP"]
+    bbox = layer_bounds(within, path) if within is not None else None
+
+    if is_parquet(path):
+        filters = [("COUNTYFP", "in", list(counties))] if counties is not None else None
+        bg = read_layer(path, columns=columns, filters=filters)
+        if bbox is not None:
+            bg = bg.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+        return bg
+
+    where = None
+    if counties is not None:
+        where = "COUNTYFP IN ({})".format(", ".join(f"'{code}'" for code in counties))
+    return gpd.read_file(
+        path,
+        engine="pyogrio",
+        columns=columns,
+        where=where,
+        bbox=bbox,
+        use_arrow=pyarrow is not None,
+    )
+
+
+def write_parquet(gdf, path):
+    """Write GeoParquet atomically (temp file + rename), creating the folder if needed."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    gdf.to_parquet(tmp_path, compression="zstd", index=False)
+    os.replace(tmp_path, path)
+
+
+def write_layer(gdf, path, export_shapefile=False):
+    """Write ``gdf`` in the format given by ``path``'s suffix.
+
+    With ``export_shapefile=True`` a GeoParquet output also gets a ``.shp``
+    copy next to it. Field names in that copy are cut to 10 characters.
+    """
+    path = Path(path)
+    if not is_parquet(path):
+        gdf.to_file(path)
+        return
+
+    write_parquet(gdf, path)
+    if export_shapefile:
+        shp_path = path.with_suffix(".shp")
+        gdf.to_file(shp_path)
+        print(f"🗺️ Exported shapefile copy to {shp_path}")
+
+
+def field(gdf, name):
+    """Return column ``name``, also found under its 10-character shapefile name.
+
+    Lets a script read the same field from GeoParquet (``centroid_shift``) or
+    from a shapefile export (``centroid_s``).
+    """
+    if name in gdf.columns:
+        return gdf[name]
+    return gdf[name[:SHAPEFILE_FIELD_LIMIT]]
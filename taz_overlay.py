@@ -0,0 +1,199 @@
+"""STRtree-backed intersection overlay shared by the TAZ adjustment scripts.
+
+``overlay_intersection(taz, cbg)`` is a drop-in replacement for
+``gpd.overlay(taz, cbg, how="intersection")``: same columns (df1 attributes,
+then df2 attributes, then geometry), same ``_1``/``_2`` suffixes for clashing
+names and the same ``keep_geom_type`` behaviour.
+
+Candidate TAZ x CBG pairs come from a single bulk STRtree query. Pairs where
+one polygon covers the other are resolved without any overlay work (the piece
+is simply the smaller polygon), and only the remaining pairs go through
+``shapely.intersection`` in vectorized batches. ``workers`` spreads those
+batches over a thread pool; the default (one per core) runs them in line on a
+single-core machine.
+
+This module is about matching ``gpd.overlay`` output through one shared code
+path, not about speed: both spend their time in the same GEOS intersections
+and run at about the same speed. ``benchmark_taz.py`` times the overlay stage.
+"""
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+POLYGON_TYPE_IDS = [3, 6]  # Polygon, MultiPolygon
+COLLECTION_TYPE_ID = 7  # GeometryCollection
+DEFAULT_BATCH_SIZE = 50_000
+
+
+def _geometry_array(gdf, make_valid):
+    geoms = np.asarray(gdf.geometry.values, dtype=object).copy()
+    if make_valid:
+        invalid = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+        if invalid.any():
+            geoms[invalid] = shapely.make_valid(geoms[invalid])
+    return geoms
+
+
+def _polygonal_parts(geoms):
+    """Keep only the polygonal part of each geometry (None when there is none)."""
+    type_ids = shapely.get_type_id(geoms)
+    out = np.where(np.isin(type_ids, POLYGON_TYPE_IDS), geoms, None)
+
+    collections = np.flatnonzero(type_ids == COLLECTION_TYPE_ID)
+    if len(collections):
+        parts, owner = shapely.get_parts(geoms[collections], return_index=True)
+        keep = np.isin(shapely.get_type_id(parts), POLYGON_TYPE_IDS)
+        polys, sub = shapely.get_parts(parts[keep], return_index=True)
+        owner = owner[keep][sub]
+        if len(polys):
+            owners, compact = np.unique(owner, return_inverse=True)
+            merged = shapely.multipolygons(polys, indices=compact)
+            single = np.bincount(compact) == 1
+            merged[single] = shapely.get_geometry(merged[single], 0)
+            out[collections[owners]] = merged
+    return out
+
+
+def filter_geom_type(pieces, keep_geom_type=None, stacklevel=2):
+    """Apply overlay's ``keep_geom_type`` rule to an array of intersection pieces.
+
+    With ``None`` or ``True`` only polygonal parts are kept (``None`` warns
+    about what was dropped, as ``gpd.overlay`` does); ``False`` keeps all.
+    """
+    if keep_geom_type is False:
+        return pieces
+    polygonal = _polygonal_parts(pieces)
+    dropped = int((~shapely.is_missing(pieces) & shapely.is_missing(polygonal)).sum())
+    if keep_geom_type is None and dropped:
+        warnings.warn(
+            f"`keep_geom_type=True` in overlay resulted in {dropped} dropped geometries "
+            "of different geometry types than df1 has. Set `keep_geom_type=False` to "
+            "retain all geometries",
+            UserWarning,
+            stacklevel=stacklevel,
+        )
+    return polygonal
+
+
+def _suffix_columns(left, right):
+    clashes = left.columns.intersection(right.columns)
+    left = left.rename(columns={col: f"{col}_1" for col in clashes})
+    right = right.rename(columns={col: f"{col}_2" for col in clashes})
+    return left, right
+
+
+def intersecting_pairs(left_geoms, right_geoms):
+    """Return sorted (left, right) positional index arrays of intersecting pairs."""
+    tree = shapely.STRtree(right_geoms)
+    idx_left, idx_right = tree.query(left_geoms, predicate="intersects")
+    order = np.lexsort((idx_right, idx_left))
+    return idx_left[order], idx_right[order]
+
+
+def intersect_pairs(left_geoms, right_geoms, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """Vectorized pairwise intersection of two aligned geometry arrays.
+
+    Pairs where one side covers the other are returned as the covered
+    geometry directly; everything else is intersected in batches of at most
+    ``batch_size`` pairs on ``workers`` threads (default: all cores).
+    """
+    result = np.empty(len(left_geoms), dtype=object)
+    shapely.prepare(left_geoms)
+    shapely.prepare(right_geoms)
+
+    left_inside = shapely.covers(right_geoms, left_geoms)
+    result[left_inside] = left_geoms[left_inside]
+    right_inside = ~left_inside & shapely.covers(left_geoms, right_geoms)
+    result[right_inside] = right_geoms[right_inside]
+
+    todo = np.flatnonzero(~(left_inside | right_inside))
+    workers = workers or os.cpu_count() or 1
+    step = max(1, min(batch_size, -(-len(todo) // workers)))
+    chunks = [todo[start:start + step] for start in range(0, len(todo), step)]
+
+    def run(chunk):
+        result[chunk] = shapely.intersection(left_geoms[chunk], right_geoms[chunk])
+
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, chunks))
+    else:
+        for chunk in chunks:
+            run(chunk)
+    return result
+
+
+def overlay_intersection(
+    df1, df2, keep_geom_type=None, make_valid=True, batch_size=DEFAULT_BATCH_SIZE, workers=None
+):
+    """Intersect two polygon GeoDataFrames like ``gpd.overlay(how="intersection")``."""
+    if df1.crs != df2.crs:
+        warnings.warn(
+            f"CRS mismatch between the CRS of left geometries and the CRS of right geometries.\n"
+            f"Left CRS: {df1.crs}\nRight CRS: {df2.crs}",
+            UserWarning,
+            stacklevel=2,
+        )
+
+    left_geoms = _geometry_array(df1, make_valid)
+    right_geoms = _geometry_array(df2, make_valid)
+    idx_left, idx_right = intersecting_pairs(left_geoms, right_geoms)
+
+    pieces = intersect_pairs(
+        left_geoms[idx_left], right_geoms[idx_right], batch_size=batch_size, workers=workers
+    )
+
+    pieces = filter_geom_type(pieces, keep_geom_type, stacklevel=3)
+    keep = ~shapely.is_missing(pieces) & ~shapely.is_empty(pieces)
+    idx_left, idx_right, pieces = idx_left[keep], idx_right[keep], pieces[keep]
+
+    left_attrs = df1.drop(columns=df1.geometry.name).iloc[idx_left].reset_index(drop=True)
+    right_attrs = df2.drop(columns=df2.geometry.name).iloc[idx_right].reset_index(drop=True)
+    left_attrs, right_attrs = _suffix_columns(left_attrs, right_attrs)
+    attrs = pd.concat([left_attrs, right_attrs], axis=1)
+    return gpd.GeoDataFrame(attrs, geometry=pieces, crs=df1.crs)
+
+
+def preserve_or_split(taz, bg, make_valid=True, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """Batch version of the per-TAZ "preserve or split" loop.
+
+    A TAZ that intersects exactly one block group is kept whole
+    (``Preserved`` = 1). A TAZ that intersects several is split into its
+    polygonal pieces, one per block group (``Preserved`` = 0). Every TAZ is
+    classified by one bulk STRtree query and every split pair is intersected in
+    one vectorized call. ``taz_pos`` / ``bg_pos`` give the positional rows in
+    ``taz`` / ``bg``, and rows come back in the loop's order (TAZ by TAZ, block
+    groups in ``bg`` order).
+    """
+    taz_geoms = np.asarray(taz.geometry.values, dtype=object)
+    bg_geoms = np.asarray(bg.geometry.values, dtype=object)
+    taz_hit, bg_hit = intersecting_pairs(taz_geoms, bg_geoms)
+    preserved = np.bincount(taz_hit, minlength=len(taz_geoms))[taz_hit] == 1
+
+    pieces = np.empty(len(taz_hit), dtype=object)
+    pieces[preserved] = taz_geoms[taz_hit[preserved]]
+    split = ~preserved
+    if split.any():
+        split_pieces = intersect_pairs(
+            _geometry_array(bg, make_valid)[bg_hit[split]],
+            _geometry_array(taz, make_valid)[taz_hit[split]],
+            batch_size=batch_size,
+            workers=workers,
+        )
+        pieces[split] = filter_geom_type(split_pieces, keep_geom_type=True)
+
+    keep = ~shapely.is_missing(pieces) & ~shapely.is_empty(pieces)
+    return gpd.GeoDataFrame(
+        {
+            "taz_pos": taz_hit[keep],
+            "bg_pos": bg_hit[keep],
+            "Preserved": preserved[keep].astype(int),
+        },
+        geometry=pieces[keep],
+        crs=taz.crs,
+    )
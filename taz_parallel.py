@@ -0,0 +1,119 @@
+"""County-sharded, multi-process execution helpers for the TAZ adjustment scripts.
+
+Block groups are partitioned by county (SJTPO counties first, anything else the
+TAZ layer touches in one extra shard) and each shard is overlaid against only
+the TAZs that intersect it. Every CBG lives in exactly one shard, so the union
+of the shard outputs is exactly the single-process overlay; TAZs that cross a
+county line simply contribute pieces to several shards.
+
+Dissolves are sharded by TAZ instead of county, so all pieces of a TAZ (on
+either side of a county line) are dissolved together by a single worker and
+no cross-shard geometry stitching is needed.
+
+Scripts that use these helpers must guard their entry point with
+``if __name__ == "__main__":`` because Windows starts worker processes by
+re-importing the main module.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from taz_io import SJTPO_COUNTIES
+from taz_overlay import overlay_intersection
+
+OTHER_SHARD = "other"
+
+
+def _worker_count(max_workers, n_tasks):
+    return max(1, min(max_workers or os.cpu_count() or 1, n_tasks))
+
+
+def _county_codes(cbg, county_col="COUNTYFP"):
+    if county_col in cbg.columns:
+        return cbg[county_col].astype(str)
+    return cbg["GEOID"].astype(str).str[2:5]
+
+
+def county_shards(taz, cbg, counties=SJTPO_COUNTIES, shards_per_county=1):
+    """Split a TAZ x CBG overlay into independent ``(label, taz_part, cbg_part)`` shards.
+
+    Only CBGs that intersect at least one TAZ are kept. Large counties can be
+    split further into ``shards_per_county`` runs of consecutive GEOIDs (tracts
+    are numbered spatially, so runs stay compact) to use more cores than there
+    are counties.
+    """
+    taz_geoms = np.asarray(taz.geometry.values, dtype=object)
+    cbg_geoms = np.asarray(cbg.geometry.values, dtype=object)
+    cbg_hit, taz_hit = shapely.STRtree(taz_geoms).query(cbg_geoms, predicate="intersects")
+    if len(cbg_hit) == 0:
+        return []
+
+    county = _county_codes(cbg).to_numpy()
+    label = np.where(np.isin(county, counties), county, OTHER_SHARD)
+    geoid = cbg["GEOID"].astype(str).to_numpy()
+
+    shards = []
+    for name in [*counties, OTHER_SHARD]:
+        members = np.flatnonzero(label[cbg_hit] == name)
+        if not len(members):
+            continue
+        cbg_idx = np.unique(cbg_hit[members])
+        cbg_idx = cbg_idx[np.argsort(geoid[cbg_idx], kind="stable")]
+        for n, chunk in enumerate(np.array_split(cbg_idx, min(shards_per_county, len(cbg_idx)))):
+            taz_idx = np.unique(taz_hit[members][np.isin(cbg_hit[members], chunk)])
+            shards.append((f"{name}_{n}", taz.iloc[taz_idx], cbg.iloc[np.sort(chunk)]))
+    return shards
+
+
+def _overlay_shard(taz_part, cbg_part, keep_geom_type):
+    return overlay_intersection(taz_part, cbg_part, keep_geom_type=keep_geom_type, workers=1)
+
+
+def sharded_overlay(taz, cbg, keep_geom_type=None, counties=SJTPO_COUNTIES, max_workers=None):
+    """Process-pool equivalent of ``overlay_intersection(taz, cbg)``.
+
+    Rows come back in the same order as the single-process overlay.
+    """
+    taz = taz.assign(_taz_pos=np.arange(len(taz)))
+    cbg = cbg.assign(_cbg_pos=np.arange(len(cbg)))
+    workers = _worker_count(max_workers, os.cpu_count() or 1)
+    per_county = max(1, -(-workers // len(counties)))
+    shards = county_shards(taz, cbg, counties=counties, shards_per_county=per_county)
+    if not shards:
+        return overlay_intersection(taz, cbg, keep_geom_type=keep_geom_type).drop(
+            columns=["_taz_pos", "_cbg_pos"]
+        )
+
+    _, taz_parts, cbg_parts = zip(*shards)
+    with ProcessPoolExecutor(max_workers=_worker_count(workers, len(shards))) as pool:
+        pieces = list(pool.map(_overlay_shard, taz_parts, cbg_parts, [keep_geom_type] * len(shards)))
+
+    result = pd.concat(pieces, ignore_index=True)
+    result = result.sort_values(["_taz_pos", "_cbg_pos"], kind="stable").reset_index(drop=True)
+    return result.drop(columns=["_taz_pos", "_cbg_pos"])
+
+
+def _dissolve_shard(part, by, aggfunc):
+    return part.dissolve(by=by, as_index=False, aggfunc=aggfunc)
+
+
+def dissolve_sharded(gdf, by, taz_col, aggfunc="first", max_workers=None):
+    """Process-pool equivalent of ``gdf.dissolve(by=by, as_index=False)``.
+
+    ``by`` keys must not span TAZs (e.g. ``TAZ_GEOID5``); rows are sharded on
+    ``taz_col`` so a TAZ that crosses a county line is still dissolved whole.
+    """
+    workers = _worker_count(max_workers, gdf[taz_col].nunique())
+    if workers == 1:
+        return gdf.dissolve(by=by, as_index=False, aggfunc=aggfunc)
+
+    bucket = pd.factorize(gdf[taz_col])[0] % workers
+    parts = [gdf[bucket == n] for n in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        dissolved = list(pool.map(_dissolve_shard, parts, [by] * workers, [aggfunc] * workers))
+
+    result = pd.concat(dissolved, ignore_index=True)
+    return result.sort_values(by, kind="stable").reset_index(drop=True)
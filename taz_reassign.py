@@ -0,0 +1,194 @@
+"""Batch reassignment helpers for small parcels and slivers in the TAZ adjustment scripts."""
+import geopandas as gpd
+import numpy as np
+import shapely
+
+
+def closest_geoids(values, candidates, threshold=999):
+    """Vectorized ``find_closest_geoid`` over a whole array of GEOID integers.
+
+    Each value is replaced by the numerically closest candidate when that
+    candidate is less than ``threshold`` away, otherwise it is kept. Ties go to
+    the candidate listed first in ``candidates``, exactly like ``argmin`` did in
+    the row-wise version. Candidates are sorted once and every value is
+    resolved with a single ``searchsorted``.
+    """
+    values = np.asarray(values)
+    candidates = np.asarray(candidates)
+    if len(candidates) == 0 or len(values) == 0:
+        return values.copy()
+
+    order = np.argsort(candidates, kind="stable")
+    ranked = candidates[order]
+    right = np.clip(np.searchsorted(ranked, values), 0, len(ranked) - 1)
+    left = np.clip(right - 1, 0, len(ranked) - 1)
+
+    dist_left = np.abs(ranked[left] - values)
+    dist_right = np.abs(ranked[right] - values)
+    take_left = (dist_left < dist_right) | ((dist_left == dist_right) & (order[left] < order[right]))
+    best = np.where(take_left, left, right)
+    best_dist = np.where(take_left, dist_left, dist_right)
+    return np.where(best_dist < threshold, ranked[best], values)
+
+
+def _shared_lengths(left, right, idx_left, idx_right):
+    return shapely.length(
+        shapely.intersection(shapely.boundary(left[idx_left]), shapely.boundary(right[idx_right]))
+    )
+
+
+def absorb_into(targets, parts, target_pos):
+    """Union each of ``parts`` into ``targets`` row ``target_pos`` (-1 = skip).
+
+    Every target that receives parts is rebuilt with a single grouped union,
+    however many parts it absorbs. Returns a copy of ``targets``.
+    """
+    targets = targets.copy()
+    take = target_pos >= 0
+    if not take.any():
+        return targets
+    touched = np.unique(target_pos[take])
+    target_geoms = np.asarray(targets.geometry.values, dtype=object)
+    geoms = np.concatenate([target_geoms[touched], np.asarray(parts, dtype=object)[take]])
+    labels = np.concatenate([touched, target_pos[take]])
+    merged = gpd.GeoDataFrame({"_target": labels}, geometry=geoms, crs=targets.crs).dissolve(by="_target")
+    geometry_col = targets.columns.get_loc(targets.geometry.name)
+    targets.iloc[merged.index.to_numpy(), geometry_col] = merged.geometry.to_numpy()
+    return targets
+
+
+def reassign_slivers(gdf, threshold, group_col="GEOID5", area_col="area_acres"):
+    """Merge polygons smaller than ``threshold`` into a neighbouring keeper.
+
+    Batch version of the row-wise loop in "TAZs V10.py", with the same
+    decisions. Slivers are taken in row order. Each goes to the same-
+    ``group_col`` keeper it shares the longest boundary with, or to the keeper
+    with the nearest centroid when there is none. Keepers that absorbed
+    earlier slivers are scored with their grown shape.
+
+    Neighbours come from one STRtree query, and all sliver/keeper and
+    sliver/sliver shared-boundary lengths are computed in a single vectorized
+    pass. The pieces form a planar partition, so a grown keeper's shared
+    boundary is the sum of its members' lengths and its centroid is their
+    area-weighted mean. The row-order replay therefore needs no geometry
+    work. Each keeper's geometry is then built with one grouped union.
+    """
+    is_sliver = (gdf[area_col] < threshold).to_numpy()
+    slivers = gdf[is_sliver]
+    keepers = gdf[~is_sliver]
+    if slivers.empty or keepers.empty:
+        return keepers.copy()
+
+    sliver_geoms = np.asarray(slivers.geometry.values, dtype=object)
+    keeper_geoms = np.asarray(keepers.geometry.values, dtype=object)
+    sliver_group = slivers[group_col].to_numpy()
+    keeper_group = keepers[group_col].to_numpy()
+
+    # Sliver/keeper boundary lengths (same group only) and sliver/sliver lengths (any group)
+    s_idx, k_idx = shapely.STRtree(keeper_geoms).query(sliver_geoms, predicate="intersects")
+    same = sliver_group[s_idx] == keeper_group[k_idx]
+    order = np.lexsort((k_idx[same], s_idx[same]))
+    s_idx, k_idx = s_idx[same][order], k_idx[same][order]
+    sk_len = _shared_lengths(sliver_geoms, keeper_geoms, s_idx, k_idx)
+    a_idx, b_idx = shapely.STRtree(sliver_geoms).query(sliver_geoms, predicate="intersects")
+    other = a_idx != b_idx
+    order = np.lexsort((b_idx[other], a_idx[other]))
+    a_idx, b_idx = a_idx[other][order], b_idx[other][order]
+    ss_len = _shared_lengths(sliver_geoms, sliver_geoms, a_idx, b_idx)
+
+    sk_start = np.searchsorted(s_idx, np.arange(len(slivers) + 1))
+    ss_start = np.searchsorted(a_idx, np.arange(len(slivers) + 1))
+
+    # Running area-weighted centroids of each (possibly grown) keeper
+    keeper_area = shapely.area(keeper_geoms)
+    keeper_cent = shapely.centroid(keeper_geoms)
+    base_x, base_y = shapely.get_x(keeper_cent), shapely.get_y(keeper_cent)
+    keeper_cx, keeper_cy = base_x * keeper_area, base_y * keeper_area
+    sliver_area = shapely.area(sliver_geoms)
+    sliver_cent = shapely.centroid(sliver_geoms)
+    sliver_x, sliver_y = shapely.get_x(sliver_cent), shapely.get_y(sliver_cent)
+
+    target = np.full(len(slivers), -1)
+    for s in range(len(slivers)):
+        scores = {}
+        for pos in range(sk_start[s], sk_start[s + 1]):
+            scores[k_idx[pos]] = scores.get(k_idx[pos], 0.0) + sk_len[pos]
+        for pos in range(ss_start[s], ss_start[s + 1]):
+            t = target[b_idx[pos]]
+            if t >= 0 and keeper_group[t] == sliver_group[s]:
+                scores[t] = scores.get(t, 0.0) + ss_len[pos]
+
+        best = max(scores.items(), key=lambda kv: (kv[1], -kv[0]), default=(None, 0.0))
+        if best[1] > 0:
+            t = best[0]
+        else:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cx = np.where(keeper_area > 0, keeper_cx / keeper_area, base_x)
+                cy = np.where(keeper_area > 0, keeper_cy / keeper_area, base_y)
+            t = int(np.argmin(np.hypot(cx - sliver_x[s], cy - sliver_y[s])))
+        target[s] = t
+        keeper_area[t] += sliver_area[s]
+        keeper_cx[t] += sliver_x[s] * sliver_area[s]
+        keeper_cy[t] += sliver_y[s] * sliver_area[s]
+
+    return absorb_into(keepers, sliver_geoms, target)
+
+
+def _best_shared_boundary(small_geoms, small_keys, large_geoms, large_keys, sindex):
+    """Position of the same-key large polygon sharing the longest boundary with
+    each small polygon (ties go to the lowest position), or -1 when none does."""
+    s_idx, l_idx = sindex.query(small_geoms)
+    same = small_keys[s_idx] == large_keys[l_idx]
+    s_idx, l_idx = s_idx[same], l_idx[same]
+    shared = _shared_lengths(small_geoms, large_geoms, s_idx, l_idx)
+    hit = shared > 0
+    s_idx, l_idx, shared = s_idx[hit], l_idx[hit], shared[hit]
+
+    order = np.lexsort((l_idx, -shared, s_idx))
+    s_idx, l_idx = s_idx[order], l_idx[order]
+    first = np.r_[True, s_idx[1:] != s_idx[:-1]] if len(s_idx) else np.zeros(0, dtype=bool)
+    target = np.full(len(small_geoms), -1)
+    target[s_idx[first]] = l_idx[first]
+    return target
+
+
+def merge_small_parcels(small_gdf, large_gdf, key="GEOID2020", sindex=None, cascade_rounds=0):
+    """Merge small parcels into the same-``key`` large polygon they share the most boundary with.
+
+    All parcel -> target assignments are computed first (bbox candidates from
+    ``sindex``, the large layer's spatial index, then one vectorized pass of
+    shared-boundary lengths), and each target is then merged exactly once.
+    With ``cascade_rounds`` > 0, parcels left over are retried against the
+    merged polygons, so a parcel that only touches an absorbed neighbour can
+    still attach. Returns ``(merged_large_gdf, unmerged_small_gdf)``.
+
+    This is not the same as merging parcels one at a time: there, each parcel
+    is compared with polygons that already absorbed the earlier parcels. Where
+    small parcels touch each other, the merged shapes and the unmerged count
+    can differ from that loop, with or without cascade rounds.
+    """
+    if sindex is None:
+        sindex = large_gdf.sindex
+    remaining = small_gdf
+    merged = large_gdf
+    large_keys = large_gdf[key].to_numpy()
+
+    for round_no in range(cascade_rounds + 1):
+        if remaining.empty:
+            break
+        if round_no > 0:
+            sindex = merged.sindex
+        small_geoms = np.asarray(remaining.geometry.values, dtype=object)
+        target = _best_shared_boundary(
+            small_geoms,
+            remaining[key].to_numpy(),
+            np.asarray(merged.geometry.values, dtype=object),
+            large_keys,
+            sindex,
+        )
+        if not (target >= 0).any():
+            break
+        merged = absorb_into(merged, small_geoms, target)
+        remaining = remaining[target < 0]
+
+    return merged, remaining
@@ -0,0 +1,111 @@
+"""Zone-to-zone distance skims from TAZ centroids.
+
+An adjusted TAZ layer can hold several pieces per zone (a TAZ split by block
+group). The pieces are collapsed to one area-weighted centroid per zone
+without unioning any geometry. The full centroid distance matrix is then
+filled one block of rows at a time, so the float64 temporaries stay at
+``block_rows x zones`` whatever the zone count. The stored skim is float32
+miles.
+
+Off-diagonal cells are straight-line (``"euclidean"``) or ``"manhattan"``
+distances, times an optional ``circuity`` factor for the road network.
+Intrazonal cells (the diagonal) are estimated from zone area. The default
+is the mean distance between two random points in a circle of the zone's
+area (``128 / 45pi`` of its radius), with the same circuity applied.
+"""
+import numpy as np
+import pandas as pd
+
+from geom_metrics import geometry_metrics
+from matrix_store import write_matrix_store
+
+FEET_PER_MILE = 5280
+INTRAZONAL_FACTOR = 128 / (45 * np.pi)
+DEFAULT_BLOCK_ROWS = 1024
+
+
+def zone_ids(values):
+    """Zone IDs as int64 when they are all whole numbers, else as fixed-width strings."""
+    numeric = pd.to_numeric(pd.Series(values), errors="coerce")
+    if numeric.notna().all() and (numeric % 1 == 0).all():
+        return numeric.to_numpy(dtype=np.int64)
+    return np.asarray(values).astype(str)
+
+
+def zone_centroids(gdf, zone_col):
+    """One row per zone: ``zone``, area-weighted ``x`` / ``y`` and total ``area_ft2``.
+
+    Zones come back in order of first appearance in ``gdf``.
+    """
+    metrics = geometry_metrics(gdf)
+    parts = pd.DataFrame({
+        "zone": gdf[zone_col].to_numpy(),
+        "area_ft2": metrics["area_ft2"].to_numpy(),
+        "wx": (metrics["centroid_x"] * metrics["area_ft2"]).to_numpy(),
+        "wy": (metrics["centroid_y"] * metrics["area_ft2"]).to_numpy(),
+    })
+    zones = parts.groupby("zone", sort=False).sum()
+    if (zones["area_ft2"] <= 0).any():
+        bad = zones.index[zones["area_ft2"] <= 0].tolist()
+        raise ValueError(f"Zones with no area cannot be skimmed: {bad[:10]}")
+    return pd.DataFrame({
+        "zone": zone_ids(zones.index),
+        "x": zones["wx"] / zones["area_ft2"],
+        "y": zones["wy"] / zones["area_ft2"],
+        "area_ft2": zones["area_ft2"],
+    }).reset_index(drop=True)
+
+
+def intrazonal_distance(area_ft2, factor=INTRAZONAL_FACTOR):
+    """Typical trip length inside a zone, in CRS units, from its area."""
+    return factor * np.sqrt(np.asarray(area_ft2, dtype=np.float64) / np.pi)
+
+
+def distance_matrix(
+    x,
+    y,
+    area_ft2=None,
+    metric="euclidean",
+    circuity=1.0,
+    intrazonal_factor=INTRAZONAL_FACTOR,
+    units_per_mile=FEET_PER_MILE,
+    block_rows=DEFAULT_BLOCK_ROWS,
+):
+    """Full zones x zones float32 distance matrix in miles.
+
+    ``area_ft2`` fills the diagonal with ``intrazonal_distance``. Without it
+    the diagonal stays zero.
+    """
+    if metric not in ("euclidean", "manhattan"):
+        raise ValueError(f"metric must be 'euclidean' or 'manhattan' (got {metric!r})")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    scale = circuity / units_per_mile
+
+    out = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        rows = slice(start, min(start + block_rows, n))
+        dx = x[rows, None] - x[None, :]
+        dy = y[rows, None] - y[None, :]
+        if metric == "euclidean":
+            dx *= dx
+            dy *= dy
+            dx += dy
+            np.sqrt(dx, out=dx)
+        else:
+            np.abs(dx, out=dx)
+            dx += np.abs(dy, out=dy)
+        dx *= scale
+        out[rows] = dx
+
+    if area_ft2 is not None:
+        np.fill_diagonal(out, intrazonal_distance(area_ft2, intrazonal_factor) * scale)
+    else:
+        np.fill_diagonal(out, 0)
+    return out
+
+
+def save_skim(path, zones, distance, core="DIST"):
+    """Write ``distance`` as float32 core ``core`` of a matrix store (see ``matrix_store``)."""
+    write_matrix_store(path, zone_ids(zones), {core: distance}, dtype="float32")
@@ -0,0 +1,98 @@
+"""Synthetic TAZ and block group layers for running the adjustment steps offline.
+
+``synthetic_layers(n_zones)`` returns a TAZ layer and a block group layer
+built from Voronoi tessellations of the same square study area. The TAZs are
+the cells of ``n_zones`` random seed points. The block groups are the cells
+of a subset of those seeds (``cbg_ratio`` of them), each moved by a random
+offset of ``misalignment`` times the typical zone spacing. That offset is the
+misalignment knob:
+
+* ``misalignment=0, cbg_ratio=1``: block groups coincide with the TAZs, so
+  every TAZ passes through untouched;
+* small offsets: boundaries nearly coincide and the overlay leaves thin
+  slivers along every edge, like the 2011 TAZ / 2020 block group case;
+* ``cbg_ratio < 1``: coarser block groups that cut across TAZs.
+
+Zone size is held at ``zone_acres`` whatever the count, so sliver sizes and
+counts per zone stay comparable from 1k to 100k zones. The TAZs carry
+``TAZ_112011`` and are in NJ State Plane feet. The block groups carry
+``GEOID`` / ``COUNTYFP`` / ``TRACTCE`` like the TIGER files and are in NAD83
+geographic coordinates, so reading them takes a real reprojection. Each
+quadrant of the study area is one SJTPO county. Output is deterministic for
+a given ``seed``.
+"""
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from geom_metrics import SQFT_PER_ACRE
+from taz_io import NJ_STATE_PLANE, SJTPO_COUNTIES
+
+CBG_CRS = "EPSG:4269"  # NAD83 geographic, as TIGER/Line ships
+ORIGIN_FT = (150000.0, 50000.0)  # south-west corner of the study area in EPSG:3424
+DEFAULT_ZONE_ACRES = 640  # one square mile
+DEFAULT_MISALIGNMENT = 0.02
+DEFAULT_CBG_RATIO = 1.0
+BLOCK_GROUPS_PER_TRACT = 4
+
+
+def voronoi_cells(points, extent):
+    """Voronoi cell of every point in ``points`` (n x 2), clipped to the ``extent`` box, in input order."""
+    cells = shapely.voronoi_polygons(shapely.multipoints(points), extend_to=extent, ordered=True)
+    return shapely.intersection(np.asarray(shapely.get_parts(cells)), extent)
+
+
+def _county_index(points, extent):
+    minx, miny, maxx, maxy = extent.bounds
+    east = points[:, 0] >= (minx + maxx) / 2
+    north = points[:, 1] >= (miny + maxy) / 2
+    return east.astype(int) + 2 * north.astype(int)
+
+
+def _block_group_ids(county_idx):
+    """GEOID / COUNTYFP / TRACTCE numbered consecutively within each county."""
+    n = len(county_idx)
+    order = np.argsort(county_idx, kind="stable")
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(n) - np.searchsorted(county_idx[order], county_idx[order])
+    county = np.asarray(SJTPO_COUNTIES)[county_idx]
+    tract = np.char.zfill((rank // BLOCK_GROUPS_PER_TRACT + 1).astype(str), 4).astype(object) + "00"
+    block_group = (rank % BLOCK_GROUPS_PER_TRACT + 1).astype(str).astype(object)
+    return {
+        "GEOID": "34" + county.astype(object) + tract + block_group,
+        "COUNTYFP": county,
+        "TRACTCE": tract,
+    }
+
+
+def synthetic_layers(
+    n_zones,
+    misalignment=DEFAULT_MISALIGNMENT,
+    cbg_ratio=DEFAULT_CBG_RATIO,
+    zone_acres=DEFAULT_ZONE_ACRES,
+    seed=0,
+):
+    """``(taz, cbg)`` GeoDataFrames for ``n_zones`` TAZs (see the module docstring)."""
+    rng = np.random.default_rng(seed)
+    spacing = np.sqrt(zone_acres * SQFT_PER_ACRE)
+    side = spacing * np.sqrt(n_zones)
+    x0, y0 = ORIGIN_FT
+    extent = shapely.box(x0, y0, x0 + side, y0 + side)
+
+    taz_seeds = rng.uniform(0, side, size=(n_zones, 2)) + ORIGIN_FT
+    taz = gpd.GeoDataFrame(
+        {"TAZ_112011": np.arange(1, n_zones + 1)},
+        geometry=voronoi_cells(taz_seeds, extent),
+        crs=NJ_STATE_PLANE,
+    )
+
+    n_cbg = max(1, int(round(n_zones * cbg_ratio)))
+    cbg_seeds = taz_seeds[rng.permutation(n_zones)[:n_cbg]] if n_cbg < n_zones else taz_seeds
+    cbg_seeds = cbg_seeds + rng.normal(0, misalignment * spacing, size=cbg_seeds.shape)
+    cbg_seeds = np.clip(cbg_seeds, [x0, y0], [x0 + side, y0 + side])
+    cbg = gpd.GeoDataFrame(
+        _block_group_ids(_county_index(cbg_seeds, extent)),
+        geometry=voronoi_cells(cbg_seeds, extent),
+        crs=NJ_STATE_PLANE,
+    ).to_crs(CBG_CRS)
+    return taz, cbg
@@ -0,0 +1,132 @@
+"""Per-step timing and run telemetry for the adjustment and QA scripts.
+
+A script creates one ``RunTelemetry`` per run and wraps each of its numbered
+steps in ``with telemetry.step(name, *inputs) as step:``. Each step records:
+
+* wall-clock and CPU seconds;
+* rows and geometry vertices of the ``inputs`` frames, counted on entry;
+* rows and vertices of whatever is passed to ``step.outputs(...)``, counted
+  on exit.
+
+A one-line duration is printed as each step finishes. ``telemetry.finish()``
+appends the whole run to ``outputs/telemetry/runs.jsonl`` as one JSON line:
+script, start time, host, totals and the list of steps. Runs can then be
+compared over time with ``pd.read_json(path, lines=True)``.
+
+When a step raises, the run is written straight away with ``status``
+``"failed"``, the step name and the error, and the exception carries on as
+before. Counting vertices is one vectorized pass over each frame. Pass
+``count_vertices=False`` to skip it.
+"""
+import json
+import os
+import platform
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+ROOT = Path(__file__).resolve().parent
+TELEMETRY_PATH = ROOT / "outputs" / "telemetry" / "runs.jsonl"
+
+
+def frame_counts(frames, count_vertices=True):
+    """Total ``(rows, vertices)`` of ``frames``; vertices is None when none of them has geometry."""
+    rows, vertices = 0, None
+    for frame in frames:
+        rows += len(frame)
+        geometry = getattr(frame, "geometry", None) if count_vertices else None
+        if geometry is not None and hasattr(geometry, "values"):
+            n = int(shapely.get_num_coordinates(np.asarray(geometry.values, dtype=object)).sum())
+            vertices = (vertices or 0) + n
+    return rows, vertices
+
+
+class Step:
+    """Timings and counts of one step; call ``outputs(...)`` with the frames the step produced."""
+
+    def __init__(self, name):
+        self.name = name
+        self.record = {"step": name}
+        self._outputs = ()
+
+    def outputs(self, *frames):
+        self._outputs = frames
+
+
+class RunTelemetry:
+    def __init__(self, script, path=TELEMETRY_PATH, count_vertices=True, verbose=True):
+        self.script = script
+        self.path = Path(path) if path is not None else None
+        self.count_vertices = count_vertices
+        self.verbose = verbose
+        self.steps = []
+        self.finished = False
+        self.record = {
+            "script": script,
+            "run_id": uuid.uuid4().hex[:12],
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "pid": os.getpid(),
+            "python": platform.python_version(),
+        }
+        self._start = time.perf_counter(), time.process_time()
+
+    def step(self, name, *inputs):
+        return _StepContext(self, name, inputs)
+
+    def seconds(self):
+        """``{step: wall seconds}`` for the steps run so far."""
+        return {s["step"]: s["wall_s"] for s in self.steps}
+
+    def finish(self, status="ok", error=None, failed_step=None):
+        """Close the run and append its record to the JSON-lines log; returns the record."""
+        if self.finished:
+            return self.record
+        self.finished = True
+        self.record.update(
+            status=status,
+            wall_s=round(time.perf_counter() - self._start[0], 4),
+            cpu_s=round(time.process_time() - self._start[1], 4),
+            steps=self.steps,
+        )
+        if error is not None:
+            self.record.update(failed_step=failed_step, error=error)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.record, default=str) + "\n")
+            if self.verbose:
+                print(f"📈 Telemetry for {self.script} ({self.record['wall_s']:.1f}s) appended to {self.path}")
+        return self.record
+
+
+class _StepContext:
+    def __init__(self, telemetry, name, inputs):
+        self.telemetry, self.step = telemetry, Step(name)
+        self.inputs = inputs
+
+    def __enter__(self):
+        if self.inputs:
+            rows, vertices = frame_counts(self.inputs, self.telemetry.count_vertices)
+            self.step.record.update(rows_in=rows, vertices_in=vertices)
+        self.start = time.perf_counter(), time.process_time()
+        return self.step
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.step.record
+        record["wall_s"] = round(time.perf_counter() - self.start[0], 4)
+        record["cpu_s"] = round(time.process_time() - self.start[1], 4)
+        if self.step._outputs:
+            rows, vertices = frame_counts(self.step._outputs, self.telemetry.count_vertices)
+            record.update(rows_out=rows, vertices_out=vertices)
+        self.telemetry.steps.append(record)
+
+        if exc_type is not None:
+            self.telemetry.finish("failed", error=f"{exc_type.__name__}: {exc}", failed_step=self.step.name)
+        elif self.telemetry.verbose:
+            print(f"⏱️ {self.step.name}: {record['wall_s']:.2f}s wall, {record['cpu_s']:.2f}s CPU")
+        return False
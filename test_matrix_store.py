@@ -0,0 +1,32 @@
+"""Zone lookups in matrix_store.MatrixStore (run with ``python -m pytest test_matrix_store.py``)."""
+import numpy as np
+import pytest
+
+from matrix_store import MatrixStore, write_matrix_store
+
+
+@pytest.fixture
+def string_store(tmp_path):
+    path = tmp_path / "zones.odm"
+    write_matrix_store(path, ["A1", "B2"], {"DIST": np.arange(4, dtype=np.float32).reshape(2, 2)})
+    return MatrixStore(path)
+
+
+def test_positions_of_known_string_zones(string_store):
+    assert string_store.positions(["B2", "A1"]).tolist() == [1, 0]
+    assert string_store.submatrix("DIST", ["B2"]).tolist() == [[3.0]]
+
+
+def test_longer_unknown_string_zone_raises(string_store):
+    # "A1X" must not be truncated to the stored width and matched to "A1"
+    with pytest.raises(KeyError, match="A1X"):
+        string_store.positions(["A1X"])
+
+
+def test_positions_of_integer_zones(tmp_path):
+    path = tmp_path / "taz.odm"
+    write_matrix_store(path, [101, 102, 103], {"DIST": np.zeros((3, 3), dtype=np.float32)})
+    store = MatrixStore(path)
+    assert store.positions(np.array([103, 101], dtype=np.int32)).tolist() == [2, 0]
+    with pytest.raises(KeyError):
+        store.positions([104])
@@ -1,15 +1,29 @@
+import numpy as np
 import pandas as pd
 import os
 
+from friction_functions import (
+    FRICTION_FUNCTIONS_PATH,
+    QA_MAX_DISTANCE_MI,
+    evaluate,
+    fit_function,
+    is_monotonic_decreasing,
+    save_functions,
+)
+
 print("Building Gravity Friction Factors (TLFDs)...")
 
 # === Step 1: Define Distance Bins (in miles) ===
 dist_bins = ["0–1", "1–2", "2–3", "3–5", "5–10", "10–20", "20–30", "30–40", "40+"]
+dist_min = [0, 1, 2, 3, 5, 10, 20, 30, 40]
+dist_max = [1, 2, 3, 5, 10, 20, 30, 40, 50]  # open-ended last bin closed at 50 for fitting
 
 # === Step 2: Define Friction Factors by Trip Purpose ===
 # These are placeholder decay curves — calibrate later based on observed data
 tlfd_data = {
     "DIST_BIN_MI": dist_bins,
+    "DIST_MIN_MI": dist_min,
+    "DIST_MAX_MI": dist_max,
     "HBW":  [1.00, 0.95, 0.85, 0.75, 0.60, 0.40, 0.20, 0.08, 0.01],
     "HBO":  [1.00, 0.92, 0.80, 0.65, 0.40, 0.20, 0.08, 0.02, 0.00],
     "HBS":  [1.00, 0.90, 0.78, 0.60, 0.35, 0.15, 0.05, 0.01, 0.00],
@@ -17,6 +31,9 @@ tlfd_data = {
 
 df = pd.DataFrame(tlfd_data)
 
+# Continuous form fitted to each binned curve ("gamma", "exponential" or "power")
+FRICTION_FUNCTIONS = {"HBW": "exponential", "HBO": "gamma", "HBS": "gamma"}
+
 # === Step 3: Basic QA Check ===
 for col in ["HBW", "HBO", "HBS"]:
     if not df[col].is_monotonic_decreasing:
@@ -24,12 +41,29 @@ for col in ["HBW", "HBO", "HBS"]:
     else:
         print(f"✅ Friction curve for {col} passes monotonic check.")
 
-# === Step 4: Save to Outputs ===
+# === Step 4: Fit continuous friction functions ===
+midpoints = (df["DIST_MIN_MI"] + df["DIST_MAX_MI"]) / 2
+functions = {}
+for col, kind in FRICTION_FUNCTIONS.items():
+    params = fit_function(kind, midpoints, df[col])
+    functions[col] = {"function": kind, "params": params}
+    fitted = evaluate(kind, midpoints, params)
+    rmse = float(np.sqrt(np.mean((fitted - df[col]) ** 2)))
+    terms = ", ".join(f"{k}={v:.4g}" for k, v in params.items())
+    print(f"📈 {col}: {kind}({terms}), RMSE vs bins {rmse:.3f}")
+
+    if not is_monotonic_decreasing(kind, params):
+        print(f"⚠️ WARNING: Fitted {kind} curve for {col} rises somewhere below {QA_MAX_DISTANCE_MI} mi.")
+    else:
+        print(f"✅ Fitted {kind} curve for {col} passes monotonic check.")
+
+# === Step 5: Save to Outputs ===
 output_folder = "outputs"
 os.makedirs(output_folder, exist_ok=True)
 
 output_path = os.path.join(output_folder, "gravity_friction_factors.csv")
 df.to_csv(output_path, index=False)
+save_functions(functions, FRICTION_FUNCTIONS_PATH)
 
 print(f"\n✅ TLFD table saved to: {output_path}")
-
+print(f"✅ Fitted friction functions saved to: {FRICTION_FUNCTIONS_PATH}")
@@ -0,0 +1,97 @@
+"""Calibration of binned friction factors against observed trip length distributions.
+
+Each iteration distributes one purpose with the current curve and measures
+the modelled TLFD. The TLFD is the share of trips in each distance bin: a
+single ``np.bincount`` of the trip table weighted over the precomputed bin
+index matrix. Every factor is then scaled by ``observed / modelled`` share
+for its bin, the usual iterative adjustment, and the curve is renormalised
+to a peak of 1.
+
+Iteration stops when no bin's share is off by more than ``tol`` (absolute,
+e.g. 0.005 = half a percentage point) or after ``max_iter`` rounds. Bins
+with no observed trips get a factor of 0. Bins that no OD pair falls into
+keep their factor, since there is nothing to compare.
+"""
+import numpy as np
+import pandas as pd
+
+from trip_balancing import furness
+from trip_distribution import ROOT, gravity
+
+OBSERVED_TLFD_PATH = ROOT / "inputs" / "observed_tlfd.csv"
+DEFAULT_TOLERANCE = 0.005
+DEFAULT_MAX_ITERATIONS = 30
+
+
+def load_observed_tlfd(path, bin_labels):
+    """Observed shares by bin (columns = curves, each summing to 1).
+
+    The file has a ``DIST_BIN_MI`` column with the same labels, in the same
+    order, as the friction factor table. The other columns are trip counts,
+    percentages or shares per curve.
+    """
+    observed = pd.read_csv(path)
+    if list(observed["DIST_BIN_MI"]) != list(bin_labels):
+        raise ValueError(
+            f"Observed TLFD bins {list(observed['DIST_BIN_MI'])} do not match friction bins {list(bin_labels)}"
+        )
+    observed = observed.drop(columns="DIST_BIN_MI").astype("float64")
+    totals = observed.sum()
+    if (totals <= 0).any():
+        raise ValueError(f"Observed TLFD has no trips for: {', '.join(totals.index[totals <= 0])}")
+    return observed / totals
+
+
+def trip_length_distribution(table, bins, n_bins):
+    """Share of ``table``'s trips in each distance bin (``bins`` from ``distance_bins``)."""
+    counts = np.bincount(bins.ravel(), weights=table.ravel(), minlength=n_bins)
+    total = counts.sum()
+    return counts / total if total > 0 else counts
+
+
+def _distribute(productions, attractions, friction, balance):
+    table = gravity(productions, attractions, friction)
+    if balance:
+        furness(table, productions, attractions)
+    return table
+
+
+def calibrate_curve(
+    productions,
+    attractions,
+    bins,
+    observed_share,
+    initial,
+    tol=DEFAULT_TOLERANCE,
+    max_iter=DEFAULT_MAX_ITERATIONS,
+    balance=True,
+):
+    """Adjust one friction curve until its modelled TLFD matches ``observed_share``.
+
+    ``bins`` is the bin index of every OD cell. ``balance=True`` Furness-balances
+    each iteration's table, as the production run does. Returns ``(curve,
+    history)``: the calibrated float32 factors, and one row per iteration
+    with ``iteration``, ``max_share_gap`` and the modelled share of every bin.
+    The last row describes the returned curve.
+    """
+    observed_share = np.asarray(observed_share, dtype=np.float64)
+    curve = np.asarray(initial, dtype=np.float64).copy()
+    n_bins = len(curve)
+    curve[observed_share == 0] = 0.0
+
+    history = []
+    for iteration in range(1, max_iter + 1):
+        table = _distribute(productions, attractions, curve.astype(np.float32)[bins], balance)
+        modelled = trip_length_distribution(table, bins, n_bins)
+        gap = float(np.abs(modelled - observed_share).max())
+        history.append({"iteration": iteration, "max_share_gap": gap, **{f"bin_{b}": s for b, s in enumerate(modelled)}})
+        if gap <= tol or iteration == max_iter:
+            break
+
+        ratio = np.divide(observed_share, modelled, out=np.ones(n_bins), where=modelled > 0)
+        curve *= ratio
+        peak = curve.max()
+        if peak > 0:
+            curve /= peak
+
+    return curve.astype(np.float32), pd.DataFrame(history)
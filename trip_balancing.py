@@ -0,0 +1,141 @@
+"""Doubly-constrained balancing (Furness / IPF) of gravity trip tables.
+
+Each iteration scales every row to its production target, then every column
+to its attraction target. Tables are float32 and are scaled in place, one
+block of ``block_rows`` rows at a time, so the only extra memory is one
+block's worth of temporaries plus the row / column sum vectors (accumulated
+in float64).
+
+After a row pass the rows are exact, so convergence is measured as the
+largest relative gap between a column's sum and its attraction target.
+Rows and columns with a positive target but no trips at all (no reachable
+zone with a non-zero friction) can never be matched. They are detected on
+the first pass and reported. The remaining attraction targets are rescaled to
+the productions that can actually be placed.
+
+NumPy releases the GIL inside the scaling and reduction kernels, so
+``balance_tables`` runs purposes side by side in a thread pool.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 1e-4
+DEFAULT_MAX_ITERATIONS = 50
+DEFAULT_BLOCK_ROWS = 512
+
+
+def _ratio(target, current):
+    return np.divide(target, current, out=np.zeros_like(current), where=current > 0)
+
+
+def _final_error(table, blocks, productions, attractions, unreachable_rows, reachable_cols):
+    """Largest relative row or column gap of ``table``, over the targets that can be met."""
+    row_sum, col_sum = np.zeros(len(productions)), np.zeros(len(attractions))
+    for rows in blocks:
+        block = table[rows]
+        row_sum[rows] = block.sum(axis=1, dtype=np.float64)
+        col_sum += block.sum(axis=0, dtype=np.float64)
+    live_rows = (productions > 0) & ~unreachable_rows
+    gaps = np.concatenate([
+        np.abs(row_sum[live_rows] - productions[live_rows]) / productions[live_rows],
+        np.abs(col_sum[reachable_cols] - attractions[reachable_cols]) / attractions[reachable_cols],
+    ])
+    return float(gaps.max()) if gaps.size else 0.0
+
+
+def furness(
+    table,
+    productions,
+    attractions,
+    tol=DEFAULT_TOLERANCE,
+    max_iter=DEFAULT_MAX_ITERATIONS,
+    block_rows=DEFAULT_BLOCK_ROWS,
+):
+    """Balance ``table`` in place to row totals ``productions`` and column totals ``attractions``.
+
+    If the two totals differ, attractions are scaled to the production total.
+    Returns a report dict with ``iterations``, ``max_error``, ``converged``,
+    ``attraction_scale``, ``unreachable_rows`` and ``unreachable_columns``.
+    When ``max_iter`` runs out, ``max_error`` is the largest row or column gap
+    of the table as returned, after its last column pass.
+    """
+    n_rows, n_cols = table.shape
+    productions = np.asarray(productions, dtype=np.float64)
+    attractions = np.asarray(attractions, dtype=np.float64)
+    if productions.shape != (n_rows,) or attractions.shape != (n_cols,):
+        raise ValueError(
+            f"Targets of length {len(productions)}/{len(attractions)} do not fit a {n_rows} x {n_cols} table"
+        )
+    if max_iter < 1:
+        raise ValueError(f"max_iter must be at least 1 (got {max_iter})")
+
+    blocks = [slice(start, min(start + block_rows, n_rows)) for start in range(0, n_rows, block_rows)]
+    total_a = attractions.sum()
+
+    max_error = np.inf
+    for iterations in range(1, max_iter + 1):
+        # Row pass: rows become exact, column sums collected on the way
+        row_sum, col_sum = np.zeros(n_rows), np.zeros(n_cols)
+        for rows in blocks:
+            block = table[rows]
+            row_sum[rows] = block.sum(axis=1, dtype=np.float64)
+            block *= _ratio(productions[rows], row_sum[rows]).astype(np.float32)[:, None]
+            col_sum += block.sum(axis=0, dtype=np.float64)
+
+        if iterations == 1:
+            # Zero rows / columns stay zero under scaling: fix the targets once
+            unreachable_rows = (row_sum == 0) & (productions > 0)
+            unreachable_cols = (col_sum == 0) & (attractions > 0)
+            attractions = np.where(unreachable_cols, 0.0, attractions)
+            placeable = productions[~unreachable_rows].sum()
+            reachable_a = attractions.sum()
+            attractions *= placeable / reachable_a if reachable_a > 0 else 0.0
+            reachable = attractions > 0
+
+        gaps = np.abs(col_sum[reachable] - attractions[reachable]) / attractions[reachable]
+        max_error = float(gaps.max()) if gaps.size else 0.0
+        if max_error <= tol:
+            break
+
+        # Column pass
+        col_factor = _ratio(attractions, col_sum).astype(np.float32)
+        for rows in blocks:
+            table[rows] *= col_factor[None, :]
+    else:
+        # Out of iterations after a column pass: measure the table being returned
+        max_error = _final_error(table, blocks, productions, attractions, unreachable_rows, reachable)
+
+    return {
+        "iterations": iterations,
+        "max_error": max_error,
+        "converged": max_error <= tol,
+        "attraction_scale": float(attractions.sum() / total_a) if total_a > 0 else 1.0,
+        "unreachable_rows": int(unreachable_rows.sum()),
+        "unreachable_columns": int(unreachable_cols.sum()),
+    }
+
+
+def balance_tables(
+    tables,
+    targets,
+    tol=DEFAULT_TOLERANCE,
+    max_iter=DEFAULT_MAX_ITERATIONS,
+    block_rows=DEFAULT_BLOCK_ROWS,
+    max_workers=None,
+):
+    """Furness every table in ``tables`` in place, purposes in parallel threads.
+
+    ``targets`` maps each purpose to ``(productions, attractions)``. Returns
+    ``{purpose: report}`` (see ``furness``).
+    """
+    purposes = list(tables)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(purposes)))
+
+    def run(purpose):
+        productions, attractions = targets[purpose]
+        return furness(tables[purpose], productions, attractions, tol, max_iter, block_rows)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(purposes, pool.map(run, purposes)))
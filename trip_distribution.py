@@ -0,0 +1,130 @@
+"""Gravity-model trip distribution for the trip-model scripts.
+
+Friction factors come from ``outputs/gravity_friction_factors.csv``
+(``tlfd_builder.py``): one row per distance bin, one column per curve. Every
+cell of the zone-to-zone distance matrix is mapped to its bin in one
+``searchsorted`` call. Each purpose's friction matrix is then a single fancy
+index into its curve. Alternatively, ``distribute(..., functions=...)``
+evaluates the continuous curves fitted by ``tlfd_builder.py`` (see
+``friction_functions``) over the same matrix.
+
+Trip tables are production-constrained::
+
+    T[i, j] = P[i] * A[j] * F[i, j] / sum_k(A[k] * F[i, k])
+
+and are held as dense float32 arrays (2,000 zones is 16 MB per purpose).
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from friction_functions import friction_matrix
+from matrix_store import MatrixStore
+
+ROOT = Path(__file__).resolve().parent
+FRICTION_PATH = ROOT / "outputs" / "gravity_friction_factors.csv"
+SKIM_PATH = ROOT / "outputs" / "skims" / "skims.odm"
+DISTANCE_CORE = "DIST"
+
+BIN_COLUMNS = ["DIST_BIN_MI", "DIST_MIN_MI", "DIST_MAX_MI"]
+
+# PANDA purpose -> friction curve (REC has no curve of its own yet)
+FRICTION_CURVES = {"HBW": "HBW", "HBS": "HBS", "HBO": "HBO", "REC": "HBO"}
+
+
+def bin_lower_edges(labels):
+    """Lower bound in miles of each ``"0–1"`` / ``"40+"`` style distance bin label."""
+    edges = []
+    for label in labels:
+        match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(?:[-–]|\+)", str(label))
+        if not match:
+            raise ValueError(f"Unrecognised distance bin label: {label!r}")
+        edges.append(float(match.group(1)))
+    edges = np.asarray(edges)
+    if edges[0] != 0 or np.any(np.diff(edges) <= 0):
+        raise ValueError(f"Distance bins must start at 0 and increase: {list(labels)}")
+    return edges
+
+
+def load_friction_factors(path=FRICTION_PATH):
+    """Return ``(lower_edges, factors)``; ``factors`` is bins x curves, float32.
+
+    Lower edges come from ``DIST_MIN_MI`` when the table has it, else from the
+    ``DIST_BIN_MI`` labels.
+    """
+    table = pd.read_csv(path)
+    if "DIST_MIN_MI" in table.columns:
+        edges = table["DIST_MIN_MI"].to_numpy(dtype=np.float64)
+    else:
+        edges = bin_lower_edges(table["DIST_BIN_MI"])
+    curves = table.drop(columns=[c for c in BIN_COLUMNS if c in table.columns])
+    return edges, curves.astype("float32")
+
+
+def load_distance_skim(path=SKIM_PATH, core=DISTANCE_CORE):
+    """Return ``(zones, distance)`` from a skim store (zone IDs + float32 miles, memory-mapped)."""
+    store = MatrixStore(path)
+    return store.zones, store[core]
+
+
+def distance_bins(distance, lower_edges):
+    """Bin index of every cell of ``distance`` (distances past the last edge share the last bin)."""
+    dtype = np.uint8 if len(lower_edges) <= 256 else np.int32
+    idx = np.searchsorted(lower_edges, distance, side="right") - 1
+    return np.clip(idx, 0, len(lower_edges) - 1).astype(dtype, copy=False)
+
+
+def gravity(productions, attractions, friction):
+    """Production-constrained gravity table as float32.
+
+    Zones with no reachable attractions (a zero denominator) get an all-zero row.
+    """
+    weights = np.asarray(friction, dtype=np.float32) * np.asarray(attractions, dtype=np.float32)[None, :]
+    denom = weights.sum(axis=1, dtype=np.float64)
+    scale = np.divide(
+        np.asarray(productions, dtype=np.float64), denom, out=np.zeros_like(denom), where=denom > 0
+    )
+    weights *= scale.astype(np.float32)[:, None]
+    return weights
+
+
+def align_panda(panda, zones, id_col="TAZ_ID"):
+    """Reindex ``panda`` onto the skim's zone order (absent zones get zero trips).
+
+    Returns ``(aligned, dropped)``; ``dropped`` lists PANDA zones missing from the skim.
+    """
+    indexed = panda.set_index(id_col)
+    dropped = indexed.index.difference(pd.Index(zones))
+    aligned = indexed.reindex(zones).fillna(0.0)
+    return aligned, dropped
+
+
+def distribute(
+    panda, zones, distance, lower_edges, factors, curves=FRICTION_CURVES, id_col="TAZ_ID", functions=None
+):
+    """Gravity trip tables ``{purpose: zones x zones float32}`` for every purpose in ``curves``.
+
+    PANDA fields are ``<purpose>P`` / ``<purpose>A``. The distance binning is
+    done once and shared by all purposes. With ``functions`` (as saved by
+    ``friction_functions.save_functions``) the continuous curves are used
+    instead of the bins.
+    """
+    aligned, _ = align_panda(panda, zones, id_col)
+    bins = distance_bins(distance, lower_edges) if functions is None else None
+    tables = {}
+    for purpose, curve in curves.items():
+        if functions is None:
+            friction = factors[curve].to_numpy(dtype=np.float32)[bins]
+        else:
+            spec = functions[curve]
+            friction = friction_matrix(spec["function"], distance, spec["params"])
+        tables[purpose] = gravity(aligned[f"{purpose}P"], aligned[f"{purpose}A"], friction)
+    return tables
+
+
+def mean_trip_length(table, distance):
+    """Trip-weighted mean distance of an OD table."""
+    total = table.sum(dtype=np.float64)
+    return float(np.einsum("ij,ij->", table, distance, dtype=np.float64) / total) if total > 0 else float("nan")
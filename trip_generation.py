@@ -0,0 +1,78 @@
+"""Purpose-based trip generation for the trip-model scripts.
+
+Rates live in ``inputs/trip_rates.csv``: one row per zone variable
+(HOUSEHOLDS, EMPLOYMENT, ...) and one column per PANDA field (HBWP, HBWA, ...).
+Every production and attraction is a linear combination of the zone variables,
+so all purposes for all zones come out of a single ``(zones x variables) @
+(variables x fields)`` matrix product.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+RATES_PATH = ROOT / "inputs" / "trip_rates.csv"
+FORECASTS_PATH = ROOT / "inputs" / "taz_forecasts.csv"
+SPECIAL_ATTRACTION_FIELD = "HBOA"  # special generator trips are added to this field
+
+
+def load_rates(path=RATES_PATH):
+    """Read the rate table as a ``variables x fields`` float DataFrame."""
+    rates = pd.read_csv(path, index_col="VARIABLE")
+    bad = rates.columns[~rates.apply(pd.api.types.is_numeric_dtype)]
+    if len(bad):
+        raise ValueError(f"Non-numeric trip rates in {path}: {', '.join(bad)}")
+    return rates.astype("float64")
+
+
+def generate_trips(forecasts, rates):
+    """Return productions and attractions for every row of ``forecasts``.
+
+    ``forecasts`` must hold every variable in ``rates.index``. Columns that are
+    not rate variables (TAZ_ID, a scenario name, ...) are carried through as
+    identifiers, followed by one column per field in ``rates``.
+    """
+    missing = [v for v in rates.index if v not in forecasts.columns]
+    if missing:
+        raise ValueError(f"Forecasts are missing rate variable(s): {', '.join(missing)}")
+
+    drivers = forecasts[list(rates.index)].to_numpy(dtype="float64")
+    trips = drivers @ rates.to_numpy()
+
+    ids = forecasts.drop(columns=list(rates.index)).reset_index(drop=True)
+    return pd.concat([ids, pd.DataFrame(trips, columns=rates.columns)], axis=1)
+
+
+def apply_special_generators(panda, specials, field, trip_fields, id_col="TAZ_ID"):
+    """Add special generator ``DAILY_TRIPS`` to ``field`` of ``panda``.
+
+    Generators are summed by zone and GEN_TYPE, then applied in one indexed
+    lookup. Zones already in ``panda`` keep their row order. Zones that only
+    appear in ``specials`` are appended once, in first-seen order, with zero
+    in the other ``trip_fields``.
+
+    Returns ``(panda, summary)``, where ``summary`` has one row per zone. Each
+    row holds the trips by GEN_TYPE, ``SPECIAL_TRIPS`` and a ``STATUS`` of
+    ``"added"`` or ``"new"``.
+    """
+    by_type = specials.groupby([id_col, "GEN_TYPE"], sort=False)["DAILY_TRIPS"].sum()
+    by_zone = by_type.unstack("GEN_TYPE", fill_value=0)
+    totals = by_type.groupby(level=id_col, sort=False).sum()
+    by_zone = by_zone.reindex(totals.index)
+
+    panda = panda.copy()
+    panda[field] = panda[field] + panda[id_col].map(totals).fillna(0)
+
+    is_new = ~totals.index.isin(panda[id_col])
+    if is_new.any():
+        new_rows = pd.DataFrame(0.0, index=range(is_new.sum()), columns=list(trip_fields))
+        new_rows.insert(0, id_col, totals.index[is_new])
+        new_rows[field] = totals[is_new].to_numpy()
+        panda = pd.concat([panda, new_rows], ignore_index=True)
+
+    summary = by_zone.reset_index()
+    summary.columns.name = None
+    summary["SPECIAL_TRIPS"] = totals.to_numpy()
+    summary["STATUS"] = np.where(is_new, "new", "added")
+    return panda, summary
@@ -0,0 +1,55 @@
+"""PANDA checks shared by qa_tripgen.py, qa_dashboard.py and the scenario batch runner."""
+import os
+
+SUMMARY_FIELDS = ["HBWP", "HBWA", "HBSP", "HBSA", "HBOP", "HBOA", "RECP", "RECA"]
+HIGH_TRIPS_PER_HH = 10       # HBW + HBS + HBO productions per household
+HIGH_TOTAL_TRIPS = 10000     # very high total trips
+
+
+def panda_checks(df):
+    """Rows failing each check: ``missing_values``, ``negative_values``, ``high_trips_per_hh``."""
+    df = df.copy()
+    numeric_cols = df.select_dtypes(include=["number"]).columns
+    checks = {
+        "missing_values": df[df.isnull().any(axis=1)],
+        "negative_values": df[(df[numeric_cols] < 0).any(axis=1)],
+    }
+    df["TripsPerHH"] = (df["HBWP"] + df["HBSP"] + df["HBOP"]) / df["TAZ_ID"].replace(0, 1)
+    checks["high_trips_per_hh"] = df[df["TripsPerHH"] > HIGH_TRIPS_PER_HH]
+    return checks
+
+
+def write_checks(checks, qa_folder):
+    """Save every non-empty check as ``<qa_folder>/<check>.csv``; return the row counts."""
+    os.makedirs(qa_folder, exist_ok=True)
+    for name, rows in checks.items():
+        if not rows.empty:
+            rows.to_csv(f"{qa_folder}/{name}.csv", index=False)
+    return {name: len(rows) for name, rows in checks.items()}
+
+
+def summary_lines(df):
+    """Field statistics and the high-total-trips flag, as the lines of ``qa_summary.txt``."""
+    summary = [f"Total TAZs analyzed: {len(df)}", ""]
+
+    for field in SUMMARY_FIELDS:
+        if field in df.columns:
+            summary.append(f"--- {field} ---")
+            summary.append(f"Min: {df[field].min():,.2f}")
+            summary.append(f"Max: {df[field].max():,.2f}")
+            summary.append(f"Mean: {df[field].mean():,.2f}")
+            summary.append(f"Sum: {df[field].sum():,.2f}")
+            summary.append("")
+
+    total_trips = df[["HBWP", "HBSP", "HBOP", "RECP"]].sum(axis=1)
+    high_trips = df[total_trips > HIGH_TOTAL_TRIPS]
+    if not high_trips.empty:
+        summary.append(f"⚠️ Found {len(high_trips)} TAZs with TotalTrips > {HIGH_TOTAL_TRIPS} trips.")
+    else:
+        summary.append("✅ No TAZs with suspiciously high total trips.")
+    return summary
+
+
+def write_summary(lines, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import os
+
+from matrix_store import MatrixStore, write_matrix_store
+from trip_balancing import balance_tables
+from trip_distribution import align_panda
+
+print("Trip Table Balancing (Furness) Starting...")
+
+# === Settings ===
+TOLERANCE = 1e-4       # max relative gap between column sums and attraction targets
+MAX_ITERATIONS = 50
+BLOCK_ROWS = 512       # rows scaled per block, bounds the temporary memory
+
+# === Step 1: Load gravity trip tables and PANDA targets ===
+store = MatrixStore("outputs/trip_tables.odm")
+zones = store.zones
+tables = {name: store.load(name) for name in store.names}
+panda, _ = align_panda(pd.read_csv("outputs/panda.csv"), zones)
+targets = {p: (panda[f"{p}P"].to_numpy(), panda[f"{p}A"].to_numpy()) for p in tables}
+print(f"✅ Loaded {len(tables)} trip tables for {len(zones)} zones.")
+
+# === Step 2: Balance every purpose to productions and attractions ===
+reports = balance_tables(tables, targets, tol=TOLERANCE, max_iter=MAX_ITERATIONS, block_rows=BLOCK_ROWS)
+
+for purpose, report in reports.items():
+    icon = "✅" if report["converged"] else "⚠️"
+    print(
+        f"  {icon} {purpose}: {report['iterations']} iterations, max column error {report['max_error']:.2e}"
+        f" (attractions scaled x{report['attraction_scale']:.4f})"
+    )
+    if report["unreachable_rows"]:
+        print(f"     ⚠️ {report['unreachable_rows']} zones have productions but no reachable destination")
+    if report["unreachable_columns"]:
+        print(f"     ⚠️ {report['unreachable_columns']} zones have attractions but no trips can reach them")
+
+# === Step 3: Save balanced trip tables ===
+output_path = os.path.join("outputs", "trip_tables_balanced.odm")
+write_matrix_store(output_path, zones, tables)
+
+print(f"✅ Balanced trip tables saved to {output_path}")
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import os
+
+from matrix_store import write_matrix_store
+from friction_functions import FRICTION_FUNCTIONS_PATH, load_functions
+from trip_distribution import (
+    FRICTION_CURVES,
+    FRICTION_PATH,
+    SKIM_PATH,
+    align_panda,
+    distribute,
+    load_distance_skim,
+    load_friction_factors,
+    mean_trip_length,
+)
+
+print("Gravity Trip Distribution Starting...")
+
+# === Settings ===
+FRICTION_MODE = "binned"  # or "continuous": the functions fitted by tlfd_builder.py
+
+# === Step 1: Load PANDA, distance skim and friction factors ===
+panda = pd.read_csv("outputs/panda.csv")
+if not SKIM_PATH.exists():
+    raise FileNotFoundError(f"No distance skim at {SKIM_PATH} — build the zone-to-zone skim first.")
+zones, distance = load_distance_skim(SKIM_PATH)
+lower_edges, factors = load_friction_factors(FRICTION_PATH)
+print(f"✅ Loaded {len(panda)} PANDA zones, {len(zones)} x {len(zones)} distance skim, {len(lower_edges)} distance bins.")
+
+_, dropped = align_panda(panda, zones)
+if len(dropped):
+    print(f"⚠️ {len(dropped)} PANDA zones are not in the skim and are left out: {list(dropped[:10])}")
+
+# === Step 2: Distribute each purpose ===
+functions = load_functions(FRICTION_FUNCTIONS_PATH) if FRICTION_MODE == "continuous" else None
+tables = distribute(panda, zones, distance, lower_edges, factors, functions=functions)
+
+for purpose, table in tables.items():
+    print(
+        f"  🚗 {purpose} ({FRICTION_MODE} curve {FRICTION_CURVES[purpose]}): {table.sum(dtype=np.float64):,.0f} trips, "
+        f"mean trip length {mean_trip_length(table, distance):.2f} mi"
+    )
+
+# === Step 3: Save OD trip tables ===
+output_folder = "outputs"
+os.makedirs(output_folder, exist_ok=True)
+output_path = os.path.join(output_folder, "trip_tables.odm")
+write_matrix_store(output_path, zones, tables)
+
+print(f"✅ Trip tables saved to {output_path}")
@@ -1,16 +1,29 @@
 import pandas as pd
 import os
 
+from trip_generation import (
+    FORECASTS_PATH,
+    RATES_PATH,
+    SPECIAL_ATTRACTION_FIELD,
+    apply_special_generators,
+    generate_trips,
+    load_rates,
+)
+
 print("Trip Generation Script Starting...")
 
-# === Step 1: Create trip generation data ===
-# Replace this with your real generation model later
-trip_data = {
-    "TAZ_ID": [101, 102, 103, 104],
-    "PRODUCTIONS": [2000, 1500, 1100, 1800],
-    "ATTRACTIONS": [2100, 1400, 1000, 1900]
-}
-panda_df = pd.DataFrame(trip_data)
+# === Step 1: Generate productions and attractions by purpose ===
+# Rates come from inputs/trip_rates.csv; zone forecasts from inputs/taz_forecasts.csv
+forecasts = pd.read_csv(FORECASTS_PATH)
+rates = load_rates(RATES_PATH)
+panda_df = generate_trips(forecasts, rates)
+print(f"✅ Generated {len(rates.columns)} trip fields for {len(panda_df)} zones.")
+
+output_folder = "outputs"
+os.makedirs(output_folder, exist_ok=True)
+panda_path = os.path.join(output_folder, "panda.csv")
+panda_df.to_csv(panda_path, index=False)
+print(f"✅ PANDA file saved to {panda_path}")
 
 # === Step 2: Load Special Generators ===
 special_path = "outputs/special_generators.csv"
@@ -18,29 +31,24 @@ if os.path.exists(special_path):
     specials = pd.read_csv(special_path)
     print(f"✅ Loaded {len(specials)} special generators.")
 
-    for _, row in specials.iterrows():
-        taz = row['TAZ_ID']
-        trips = row['DAILY_TRIPS']
-
-        if taz in panda_df['TAZ_ID'].values:
-            # Add to existing TAZ
-            panda_df.loc[panda_df['TAZ_ID'] == taz, 'ATTRACTIONS'] += trips
-            print(f"  ➕ Added {trips} trips to existing TAZ {taz}")
-        else:
-            # Add new TAZ row
-            new_row = {
-                "TAZ_ID": taz,
-                "PRODUCTIONS": 0,
-                "ATTRACTIONS": trips
-            }
-            panda_df = pd.concat([panda_df, pd.DataFrame([new_row])], ignore_index=True)
-            print(f"  🆕 Added new TAZ {taz} with {trips} attraction trips")
+    panda_df, summary = apply_special_generators(
+        panda_df, specials, SPECIAL_ATTRACTION_FIELD, trip_fields=rates.columns
+    )
+    added = summary["STATUS"] == "added"
+    print(f"  ➕ Added {summary.loc[added, 'SPECIAL_TRIPS'].sum():,} trips to {added.sum()} existing TAZs")
+    print(f"  🆕 Added {(~added).sum()} new TAZs with {summary.loc[~added, 'SPECIAL_TRIPS'].sum():,} attraction trips")
+    for gen_type, trips in specials.groupby("GEN_TYPE")["DAILY_TRIPS"].sum().items():
+        print(f"     {gen_type}: {trips:,} trips")
+
+    qa_folder = os.path.join(output_folder, "qa")
+    os.makedirs(qa_folder, exist_ok=True)
+    summary_path = os.path.join(qa_folder, "special_generator_summary.csv")
+    summary.to_csv(summary_path, index=False)
+    print(f"  📋 Per-zone summary saved to {summary_path}")
 else:
     print("⚠️ No special_generators.csv found — skipping merge.")
 
 # === Step 3: Save updated PANDA ===
-output_folder = "outputs"
-os.makedirs(output_folder, exist_ok=True)
 output_path = os.path.join(output_folder, "panda_with_specials.csv")
 panda_df.to_csv(output_path, index=False)
 